@@ -1,13 +1,23 @@
 # Dependencies
 # file management
 import os
+import atexit
 from shutil import copyfile
 
 # Calc
+import math
+from functools import lru_cache
 import numpy as np
 import pandas as pd
 from scipy.interpolate import interp1d
 from scipy import stats
+from numba import njit, prange, set_num_threads
+
+# GPU computation (optional)
+try:
+    import cupy as cp
+except ImportError:
+    cp = None
 
 # SEG-Y file management
 import segyio
@@ -19,14 +29,617 @@ from bokeh.models import HoverTool
 from holoviews import streams
 import panel as pn 
 
+# Rasterized crossplots (optional)
+try:
+    import datashader as ds
+    import holoviews.operation.datashader as hd
+except ImportError:
+    ds = hd = None
+
 # parallel execution of processes
-from multiprocessing import Pool
+from concurrent.futures import ThreadPoolExecutor
 
 # Visualization platform
 hv.extension('bokeh')
+# Crossplots hold every sample of a window: draw them with WebGL
+hv.renderer('bokeh').webgl = True
 
 # Import a class from other module
-from Wiggle import WiggleModule
+from Wiggle import WiggleModule, absmax
+
+# SEG-Y handles opened by each process, keyed by (process id, path, mode)
+_segy_handles = {}
+
+def _segy_handle(path, mode = "r"):
+    
+    """
+    NAME
+    ----
+        _segy_handle
+        
+    DESCRIPTION
+    -----------
+        Returns a SEG-Y file opened by the current process, opening it only the first time it
+        is requested. Keying by process id prevents child processes from reusing the handles
+        inherited from their parent. Read-only files are memory mapped when the file system 
+        allows it, so bulk reads become plain memory copies.
+        
+    ARGUMENTS
+    ---------
+        path : str
+            Path of the SEG-Y file.
+
+        mode : str
+            Segyio's file mode. "r" by default.
+            
+    RETURN
+    ------
+        segyio.SegyFile
+            Opened SEG-Y file.
+            
+    """
+    
+    key = (os.getpid(), path, mode)
+    if key not in _segy_handles:
+        _segy_handles[key] = segyio.open(path, mode)
+        if mode == "r":
+            _segy_handles[key].mmap()
+    return _segy_handles[key]
+
+@atexit.register
+def _close_segy_handles():
+    
+    """
+    NAME
+    ----
+        _close_segy_handles
+        
+    DESCRIPTION
+    -----------
+        Closes every SEG-Y file opened by _segy_handle in the current process.
+        
+    """
+    
+    # A background read of _prefetch_inline may still be using the handles
+    if _prefetched is not None and _prefetched[0][0] == os.getpid():
+        _prefetched[1].result()
+
+    for key in [key for key in _segy_handles if key[0] == os.getpid()]:
+        _segy_handles.pop(key).close()
+
+# Merge path, angle list and device installed once in each worker by _init_worker
+_worker_merge_path = None
+_worker_angle_list = None
+_worker_gpu = False
+
+def _gpu_available():
+    
+    """
+    NAME
+    ----
+        _gpu_available
+        
+    DESCRIPTION
+    -----------
+        Whether CuPy is installed and a CUDA device can be used.
+        
+    RETURN
+    ------
+        bool
+            
+    """
+    
+    return cp is not None and cp.cuda.is_available()
+
+def _init_worker(merge_path, angle_list, gpu = False):
+    
+    """
+    NAME
+    ----
+        _init_worker
+        
+    DESCRIPTION
+    -----------
+        Initializer of the attributes computation workers. Installs the merge path and the angle 
+        list as module globals, so each task only carries the inline to compute, and opens the
+        merge file and compiles the kernel ahead of the first task. The compiled kernel runs 
+        single threaded in each worker: processes already fill the cores.
+        
+    ARGUMENTS
+    ---------
+        merge_path : str
+            Path where the merge of the PAS is located.
+
+        angle_list : (Numpy)array
+            Average angle of each PAS.
+
+        gpu : bool
+            Whether the regression runs on the CUDA device through _gpu_kernel. False by default.
+            
+    """
+    
+    global _worker_merge_path, _worker_angle_list, _worker_gpu
+    _worker_merge_path, _worker_angle_list, _worker_gpu = merge_path, angle_list, gpu
+    if not gpu:
+        set_num_threads(1)
+        _avo_kernel_for(len(angle_list))
+    _segy_handle(merge_path)
+
+def _read_inline(merge_path, trace_index):
+    
+    """
+    NAME
+    ----
+        _read_inline
+        
+    DESCRIPTION
+    -----------
+        Reads every gather of an inline from the merge. The merge stores traces by inline - 
+        crossline - angle, so the inline is a single block of raw traces starting at 
+        trace_index * n_offsets. A single C-contiguous allocation keeps the sample axis innermost.
+        
+    ARGUMENTS
+    ---------
+        merge_path : str
+            Path where the merge of the PAS is located.
+
+        trace_index : int
+            Number of the first trace of the inline within the attribute SEG-Y files.
+            
+    RETURN
+    ------
+        (Numpy)ndarray or None
+            Amplitudes of the inline. Shape (crosslines, angles, samples). None past the last 
+            inline.
+            
+    """
+    
+    # The merge file stays open (and memory mapped) in this process for the following inlines
+    segy_file = _segy_handle(merge_path)
+    n_xlines, n_offsets = len(segy_file.xlines), len(segy_file.offsets)
+
+    first_trace = trace_index * n_offsets
+    if first_trace >= segy_file.tracecount:
+        return None
+    amp = segy_file.trace.raw[first_trace:first_trace + n_xlines * n_offsets]
+    return np.ascontiguousarray(amp.reshape(n_xlines, n_offsets, -1), dtype = "float32")
+
+# Prefetch thread of each process, keyed by process id, and the inline it was asked to read last
+_prefetch_threads = {}
+_prefetched = None
+
+def _prefetch_inline(merge_path, trace_index):
+    
+    """
+    NAME
+    ----
+        _prefetch_inline
+        
+    DESCRIPTION
+    -----------
+        Returns an inline of the merge and starts reading the following one in the background, 
+        so the disk keeps working while the current inline is regressed. Every read goes 
+        through a single thread per process, which serializes the access to the shared SEG-Y 
+        handle and keeps at most two inlines in memory. Consecutive inlines of a task chunk 
+        (and every inline on the GPU path) are served from the prefetch; otherwise the inline
+        is read on demand.
+        
+    ARGUMENTS
+    ---------
+        merge_path : str
+            Path where the merge of the PAS is located.
+
+        trace_index : int
+            Number of the first trace of the inline within the attribute SEG-Y files.
+            
+    RETURN
+    ------
+        (Numpy)ndarray
+            Amplitudes of the inline. Shape (crosslines, angles, samples).
+            
+    """
+    
+    global _prefetched
+    pid = os.getpid()
+    if pid not in _prefetch_threads:
+        _prefetch_threads[pid] = ThreadPoolExecutor(max_workers = 1)
+    thread = _prefetch_threads[pid]
+
+    if _prefetched is None or _prefetched[0] != (pid, merge_path, trace_index):
+        _prefetched = ((pid, merge_path, trace_index), thread.submit(_read_inline, merge_path, trace_index))
+    amp = _prefetched[1].result()
+
+    # Next inline of the survey
+    next_index = trace_index + amp.shape[0]
+    _prefetched = ((pid, merge_path, next_index), thread.submit(_read_inline, merge_path, next_index))
+    return amp
+
+def _copy_file(source, destination):
+    
+    """
+    NAME
+    ----
+        _copy_file
+        
+    DESCRIPTION
+    -----------
+        Copies a file inside the kernel with os.copy_file_range, which lets file systems such as
+        XFS or Btrfs share the blocks instead of duplicating them. Falls back to shutil's copyfile
+        where the call is not available (Python < 3.8, non Linux systems) or not supported 
+        between the given files.
+        
+    ARGUMENTS
+    ---------
+        source : str
+            Path of the file to copy.
+
+        destination : str
+            Path of the copy.
+            
+    """
+    
+    try:
+        with open(source, "rb") as file_in, open(destination, "wb") as file_out:
+            remaining = os.fstat(file_in.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(file_in.fileno(), file_out.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        if remaining == 0:
+            return
+    except (AttributeError, OSError):
+        pass
+    copyfile(source, destination)
+
+def _write_trace_headers(path, fields):
+    
+    """
+    NAME
+    ----
+        _write_trace_headers
+        
+    DESCRIPTION
+    -----------
+        Writes header fields of every trace of a SEG-Y file at once. The trace headers are 
+        reached through a memory map of the file (3600 bytes of textual and binary headers, then
+        240 bytes of header and the samples of each trace), so each field is a single strided
+        copy instead of one header write per trace.
+        
+    ARGUMENTS
+    ---------
+        path : str
+            Path of the SEG-Y file. Must not contain extended textual headers.
+
+        fields : dict
+            Big-endian values by header byte (1-based). Each value is a (values, dtype) tuple, 
+            values can be an array with one value per trace or a single value for every trace.
+            
+    """
+    
+    with segyio.open(path, ignore_geometry = True) as segy_file:
+        tracecount = segy_file.tracecount
+    trace_bytes = (os.path.getsize(path) - 3600) // tracecount
+
+    traces = np.memmap(path, dtype = "uint8", mode = "r+", offset = 3600, shape = (tracecount, trace_bytes))
+    for byte, (values, dtype) in fields.items():
+        size = np.dtype(dtype).itemsize
+        values = np.broadcast_to(np.asarray(values).astype(dtype), (tracecount, ))
+        traces[:, byte - 1:byte - 1 + size] = np.ascontiguousarray(values).view("uint8").reshape(tracecount, size)
+    traces.flush()
+    del traces
+
+@lru_cache(maxsize = None)
+def _sins(angles):
+    
+    """
+    NAME
+    ----
+        _sins
+        
+    DESCRIPTION
+    -----------
+        Square sin of the angles and its moments. Cached by angle tuple, so they are computed
+        once per process instead of once per inline. Moments are kept in double precision, 
+        the correlation coefficient near |r| = 1 depends on them.
+        
+    ARGUMENTS
+    ---------
+        angles : tuple
+            Average angle of each PAS.
+            
+    RETURN
+    ------
+        x_dev : (Numpy)ndarray
+            Deviation of each sin² from their mean.
+
+        ssx : float
+            Sum of squares of x_dev.
+
+        x_mean : float
+            Mean of the sin² of the angles.
+            
+    """
+    
+    x = np.sin(np.deg2rad(np.asarray(angles, dtype = "float64"))) ** 2
+    x_mean = x.mean()
+    x_dev = x - x_mean
+    return x_dev, (x_dev * x_dev).sum(), x_mean
+
+def _peak_amplitude(merge_path):
+    
+    """
+    NAME
+    ----
+        _peak_amplitude
+        
+    DESCRIPTION
+    -----------
+        Highest absolute amplitude of the merge, used as scaling factor of the wiggle displays.
+        Traces are scanned in blocks to bound the memory used.
+        
+    ARGUMENTS
+    ---------
+        merge_path : str
+            Path where the merge of the PAS is located.
+            
+    RETURN
+    ------
+        float
+            Highest absolute amplitude.
+            
+    """
+    
+    segy_file = _segy_handle(merge_path)
+    peak = 0.0
+    for start in range(0, segy_file.tracecount, 4096):
+        peak = max(peak, absmax(segy_file.trace.raw[start:start + 4096].ravel()))
+    return peak
+
+# Compilation options of the regression kernels
+_KERNEL_OPTIONS = dict(parallel = True, nogil = True, fastmath = {"nsz", "arcp", "contract", "afn", "reassoc"}, 
+                       error_model = "numpy")
+
+@njit(cache = True, **_KERNEL_OPTIONS)
+def _avo_kernel(amp, x_dev, ssx, x_mean):
+    
+    """
+    NAME
+    ----
+        _avo_kernel
+        
+    DESCRIPTION
+    -----------
+        Least squares fit of each sample of each trace of amp against the sin² of the angles. 
+        Traces are split between the available cores. Within a trace the angles are visited one
+        at a time and the samples are swept contiguously, so every pass streams whole cache lines
+        and vectorizes; per-sample sums live in small buffers that stay in cache. The GIL is 
+        released, so the prefetch thread keeps reading the next inline meanwhile.
+        
+    ARGUMENTS
+    ---------
+        amp : (Numpy)ndarray
+            C-contiguous amplitudes. Shape: (traces, angles, samples).
+
+        x_dev : (Numpy)ndarray
+            Deviation of each sin² from their mean.
+
+        ssx : float
+            Sum of squares of x_dev.
+
+        x_mean : float
+            Mean of the sin² of the angles.
+            
+    RETURN
+    ------
+        gradient, intercept, rvalue, serror : (Numpy)ndarray
+            float32 arrays. Shape: (traces, samples). serror is the standard error of the gradient.
+            
+    """
+    
+    traces, n, samples = amp.shape
+    gradient = np.empty((traces, samples), dtype = np.float32)
+    intercept = np.empty((traces, samples), dtype = np.float32)
+    rvalue = np.empty((traces, samples), dtype = np.float32)
+    serror = np.empty((traces, samples), dtype = np.float32)
+
+    for trace in prange(traces):
+        y_mean = np.zeros(samples, dtype = np.float64)
+        for k in range(n):
+            for j in range(samples):
+                y_mean[j] += amp[trace, k, j]
+        for j in range(samples):
+            y_mean[j] /= n
+
+        sxy = np.zeros(samples, dtype = np.float64)
+        ssy = np.zeros(samples, dtype = np.float64)
+        for k in range(n):
+            for j in range(samples):
+                y_dev = amp[trace, k, j] - y_mean[j]
+                sxy[j] += y_dev * x_dev[k]
+                ssy[j] += y_dev * y_dev
+
+        slope = np.empty(samples, dtype = np.float64)
+        for j in range(samples):
+            slope[j] = sxy[j] / ssx
+            gradient[trace, j] = slope[j]
+            intercept[trace, j] = y_mean[j] - slope[j] * x_mean
+            rvalue[trace, j] = min(max(sxy[j] / math.sqrt(ssx * ssy[j]), -1.0), 1.0)
+
+        # Residuals summed directly: ssy - slope * sxy cancels out for close fits
+        ssr = np.zeros(samples, dtype = np.float64)
+        for k in range(n):
+            for j in range(samples):
+                residual = amp[trace, k, j] - y_mean[j] - slope[j] * x_dev[k]
+                ssr[j] += residual * residual
+        # n - 2 degrees of freedom, n is above _UNROLL_LIMIT here
+        for j in range(samples):
+            serror[trace, j] = math.sqrt(ssr[j] / ((n - 2) * ssx))
+
+    return gradient, intercept, rvalue, serror
+
+# Regression kernels specialized by amount of angles, built by _avo_kernel_for
+_avo_kernels = {}
+
+# Largest amount of angles with an unrolled kernel, longer lists use _avo_kernel
+_UNROLL_LIMIT = 32
+
+def _avo_kernel_for(n):
+    
+    """
+    NAME
+    ----
+        _avo_kernel_for
+        
+    DESCRIPTION
+    -----------
+        Returns _avo_kernel specialized for n angles. The amount of angles is fixed for a survey,
+        so the kernel is generated with the loops over the angles fully unrolled and the sin² 
+        deviations as constants of each trace: every sample becomes a short chain of fused 
+        multiply-adds over n contiguous rows, vectorized along the sample axis, without the 
+        per-sample buffers of the generic kernel. Kernels are compiled eagerly on first request
+        and cached by n, once in each worker process. Each worker process runs a single thread,
+        so these kernels are compiled without parallel loops.
+        
+    ARGUMENTS
+    ---------
+        n : int
+            Amount of angles.
+            
+    RETURN
+    ------
+        function
+            Compiled kernel with _avo_kernel's arguments and return.
+            
+    """
+    
+    if n > _UNROLL_LIMIT:
+        return _avo_kernel
+    if n not in _avo_kernels:
+        angles = range(n)
+        source = "\n".join(
+            ["def _avo_kernel_n(amp, x_dev, ssx, x_mean):",
+             "    traces, _, samples = amp.shape",
+             "    gradient = np.empty((traces, samples), dtype = np.float32)",
+             "    intercept = np.empty((traces, samples), dtype = np.float32)",
+             "    rvalue = np.empty((traces, samples), dtype = np.float32)",
+             "    serror = np.empty((traces, samples), dtype = np.float32)"]
+            + [f"    x{k} = x_dev[{k}]" for k in angles]
+            + ["    for trace in range(traces):",
+               "        for j in range(samples):"]
+            + [f"            a{k} = np.float64(amp[trace, {k}, j])" for k in angles]
+            + [f"            y_mean = ({' + '.join(f'a{k}' for k in angles)}) / {n}"]
+            + [f"            d{k} = a{k} - y_mean" for k in angles]
+            + [f"            sxy = {' + '.join(f'd{k} * x{k}' for k in angles)}",
+               f"            ssy = {' + '.join(f'd{k} * d{k}' for k in angles)}",
+               "            slope = sxy / ssx",
+               "            gradient[trace, j] = slope",
+               "            intercept[trace, j] = y_mean - slope * x_mean",
+               "            rvalue[trace, j] = min(max(sxy / math.sqrt(ssx * ssy), -1.0), 1.0)",
+               # Residuals summed directly: ssy - slope * sxy cancels out for close fits. Two 
+               # angles fit exactly, like Scipy's linregress their standard error is 0
+               (f"            ssr = {' + '.join(f'(d{k} - slope * x{k}) ** 2' for k in angles)}\n"
+                f"            serror[trace, j] = math.sqrt(ssr / {n - 2} / ssx)")
+               if n > 2 else "            serror[trace, j] = 0.0",
+               "    return gradient, intercept, rvalue, serror"])
+
+        namespace = {"np": np, "math": math}
+        exec(compile(source, f"<avo kernel, {n} angles>", "exec"), namespace)
+        _avo_kernels[n] = njit("Tuple((float32[:, ::1], float32[:, ::1], float32[:, ::1], float32[:, ::1]))"
+                               "(float32[:, :, ::1], float64[::1], float64, float64)",
+                               **dict(_KERNEL_OPTIONS, parallel = False))(namespace["_avo_kernel_n"])
+    return _avo_kernels[n]
+
+def _gpu_kernel(amp, x_dev, ssx, x_mean):
+    
+    """
+    NAME
+    ----
+        _gpu_kernel
+        
+    DESCRIPTION
+    -----------
+        CuPy counterpart of _avo_kernel. The whole block is uploaded at once and the fit of every
+        sample is solved with batched elementwise operations and a single contraction against
+        the sin² deviations.
+        
+    ARGUMENTS
+    ---------
+        amp : (Numpy)ndarray
+            Amplitudes. Shape: (traces, angles, samples).
+
+        x_dev : (Numpy)ndarray
+            Deviation of each sin² from their mean.
+
+        ssx : float
+            Sum of squares of x_dev.
+
+        x_mean : float
+            Mean of the sin² of the angles.
+            
+    RETURN
+    ------
+        gradient, intercept, rvalue, serror : (Numpy)ndarray
+            float32 arrays. Shape: (traces, samples). serror is the standard error of the gradient.
+            
+    """
+    
+    # float32 upload, double precision sums on the device like the CPU kernel
+    amp = cp.asarray(amp, dtype = cp.float32)
+    x_dev = cp.asarray(x_dev, dtype = cp.float64)
+
+    y_mean = amp.mean(axis = 1, dtype = cp.float64)
+    y_dev = amp - y_mean[:, None, :]
+    sxy = cp.tensordot(x_dev, y_dev, axes = ([0], [1]))
+    ssy = (y_dev * y_dev).sum(axis = 1)
+
+    gradient = sxy / ssx
+    intercept = y_mean - gradient * x_mean
+    rvalue = cp.clip(sxy / cp.sqrt(ssx * ssy), -1.0, 1.0)
+    n = amp.shape[1]
+    if n > 2:
+        residual = y_dev - gradient[:, None, :] * x_dev[None, :, None]
+        serror = cp.sqrt((residual * residual).sum(axis = 1) / ((n - 2) * ssx))
+    else:
+        serror = cp.zeros_like(gradient)
+
+    return tuple(cp.asnumpy(attribute.astype(cp.float32)) for attribute in (gradient, intercept, rvalue, serror))
+
+# Crossplots with more samples than this are rasterized by Datashader, when available
+_RASTERIZE_POINTS = 20000
+
+# Columns of attributes_organization available as crossplot axes and color scale
+_AVO_COLUMNS = ("inline", "crossline", "time_slice", "gradient", "intercept", "rvalue", "pvalue", "serror")
+
+def _limits(values):
+    
+    """
+    NAME
+    ----
+        _limits
+        
+    DESCRIPTION
+    -----------
+        Lowest and highest values of a crossplot column, NaN skipped, in one pass each. Integer 
+        columns (inline, crossline) are reduced as floats, so NaN can be the result.
+        
+    ARGUMENTS
+    ---------
+        values : (Numpy)array
+            Values of the column.
+            
+    RETURN
+    ------
+        tuple
+            (lowest, highest). NaN for an empty window or a column without values.
+            
+    """
+    
+    if values.dtype.kind in "iu":
+        values = values.astype("float64")
+    if values.size == 0:
+        return np.nan, np.nan
+    return np.fmin.reduce(values), np.fmax.reduce(values)
 
 class AVOModule(WiggleModule):
     
@@ -39,8 +652,8 @@ class AVOModule(WiggleModule):
     -----------
         Blueprint for AVO objects.
 
-        Computes and stores AVO attributes (intercept & gradient) and statistic parameters (correlation 
-        coefficient, p-value, standard error) in brand new SEG-Y files.
+        Computes and stores AVO attributes (intercept & gradient), the correlation coefficient and
+        the standard error in brand new SEG-Y files. P-value is derived from them on demand.
 
         Plots crossplots of stored attributes and seismic lines while providing interactive tools to
         improve the experience between data and users. These plots are not images but objects
@@ -54,6 +667,17 @@ class AVOModule(WiggleModule):
 
         crosslines : list
             List of crosslines (numbers) within the survey. Empty by default.
+
+        survey : object
+            Survey object that instantiated this one. Its merge_path, angle_list and the paths of 
+            the attributes' files are read from it.
+
+        visualization : Panel Layout [Column]
+            Layout built by avo_visualization, reused by its following calls. None by default.
+
+        scaling_fac : float
+            Highest absolute amplitude of the merge, to scale the seismic lines. None until the 
+            first line is displayed.
         
     METHODS
     -------
@@ -81,12 +705,24 @@ class AVOModule(WiggleModule):
             Plot crossplots, a map and seismic lines while providing interactive methods to
             inspect the plotted data.
 
+        close_files()
+            Closes the SEG-Y files kept open by this process.
+
     INHERITANCE
     -----------
         WiggleModule.
         
     LIBRARIES
     ---------
+        CuPy: MIT licensed NumPy-compatible array library accelerated with CUDA. Optional, used
+              to compute the attributes on the GPU when a device is available. More information
+              available at:
+                   https://cupy.dev/
+
+        Datashader: BSD licensed graphics pipeline for large datasets. Optional, used to rasterize
+                    crossplots of large windows and wide lines. More information available at:
+                        https://datashader.org/
+
         Holoviews: BSD open source Python library designed to simplify the visualization of data.
                    More information available at:
                         http://holoviews.org/
@@ -95,6 +731,10 @@ class AVOModule(WiggleModule):
                         multiple processors on a given machine. More information available at: 
                             https://docs.python.org/3.4/library/multiprocessing.html?highlight=process
 
+        Numba: BSD licensed just-in-time compiler that translates Python and NumPy code into fast
+               machine code. More information available at:
+                   https://numba.pydata.org/
+
         Numpy: BSD licensed package for scientific computing with Python. More information
                available at:
                    https://numpy.org/
@@ -115,7 +755,7 @@ class AVOModule(WiggleModule):
     """     
     
     
-    def __init__(self, inlines, crosslines):
+    def __init__(self, inlines, crosslines, survey):
         """
         DESCRIPTION
         -----------
@@ -125,6 +765,28 @@ class AVOModule(WiggleModule):
         """
         self.inlines = inlines
         self.crosslines = crosslines
+        self.survey = survey
+        self.visualization = None
+        # Scaling factor of the seismic lines, scanned from the merge by the first line displayed
+        self.scaling_fac = None
+
+    @staticmethod
+    def close_files():
+        
+        """
+        NAME
+        ----
+            close_files
+            
+        DESCRIPTION
+        -----------
+            Closes the SEG-Y files (merge and attributes) kept open by this process for the 
+            crossplots and seismic lines. They are opened again by the next access, so this must be
+            called before any of them is rebuilt.
+            
+        """
+        
+        _close_segy_handles()
         
     def files_from_np(self):
         
@@ -138,7 +800,7 @@ class AVOModule(WiggleModule):
             Creates brand new SEG-Y files to store attributes.
 
             Constructs from ndarrays brand new SEG-Y files to store: gradient, intercept, correlation 
-            coefficient, p-value and standard error. To ease handling and memory usage optimization,
+            coefficient and standard error. To ease handling and memory usage optimization,
             new SEG-Y files will only contain attributes as trace data field and the following trace
             headers:
                 - SourceGroupScalar: bytes 71-72
@@ -159,22 +821,19 @@ class AVOModule(WiggleModule):
                 Amount of samples in a trace. Extracted and stored in this object by 
                 Survey.cube_data_organization function.
 
-            Survey.merge_path : str class attribute
+            Survey.merge_path : str instance attribute
                 Path where the merge of the PAS is located.
 
-            Survey.gradient_path : str class attribute
+            Survey.gradient_path : str instance attribute
                 Path where the computation of the "Gradient" will be stored.
 
-            Survey.intercept_path : str class attribute
+            Survey.intercept_path : str instance attribute
                 Path where the computation of the "Intercept" will be stored.
 
-            Survey.rvalue_path : str class attribute
+            Survey.rvalue_path : str instance attribute
                 Path where the computation of the "Correlation Coefficient" will be stored.
 
-            Survey.pvalue_path : str class attribute
-                Path where the computation of the "P Value" will be stored.
-
-            Survey.stderr_path : str class attribute
+            Survey.stderr_path : str instance attribute
                 Path where the computation of the "Standard Error" will be stored.
 
         RETURN
@@ -188,43 +847,42 @@ class AVOModule(WiggleModule):
                 https://segyio.readthedocs.io/en/latest/segyio.html
         """
         
+        # Handles kept by this process would point to the files about to be rebuilt
+        _close_segy_handles()
+
         # 3D array to build the segy file
         triD_array = np.zeros((len(self.inlines), len(self.crosslines), WiggleModule.samples_per_trace))
         
         # Create the segy file from array
-        segyio.tools.from_array3D(Survey.gradient_path, triD_array)
+        segyio.tools.from_array3D(self.survey.gradient_path, triD_array)
         
         # Extracting coordinates and scalar for traces with the same offset. By default offset[0]
-        with segyio.open(Survey.merge_path) as segy_file:
+        with segyio.open(self.survey.merge_path) as segy_file:
+            # Memory mapped reads; segyio falls back to regular I/O when mapping fails
+            segy_file.mmap()
             staked_trace_index = np.arange(0, segy_file.tracecount, len(segy_file.offsets)) 
             utmx = segy_file.attributes(segyio.TraceField.CDP_X)[staked_trace_index]
             utmy = segy_file.attributes(segyio.TraceField.CDP_Y)[staked_trace_index]
             scalar = segy_file.attributes(segyio.TraceField.SourceGroupScalar)[staked_trace_index]
             
-        # Setting lines for future segyio indexing
-        trace_counter = 0
-        with segyio.open(Survey.gradient_path, "r+") as g:
-            for iline in range(self.inlines[0], self.inlines[-1] + 1):
-                for xline in range(self.crosslines[0], self.crosslines[-1] + 1):
-                    g.header[trace_counter] = {segyio.su.scalco: scalar[trace_counter],
-                                               segyio.su.cdpx: utmx[trace_counter],
-                                               segyio.su.cdpy: utmy[trace_counter],
-                                               segyio.su.iline: iline,  # 189
-                                               segyio.su.xline: xline}  # 193
-                    
-                    trace_counter += 1
-
-        print(f"Successful construction. Gradient file path: ({Survey.gradient_path})")
+        # Setting lines for future segyio indexing, traces are sorted by inline - crossline
+        iline = np.repeat(np.arange(self.inlines[0], self.inlines[-1] + 1), len(self.crosslines))
+        xline = np.tile(np.arange(self.crosslines[0], self.crosslines[-1] + 1), len(self.inlines))
+        _write_trace_headers(self.survey.gradient_path, {71: (scalar, ">i2"),
+                                                         181: (utmx, ">i4"),
+                                                         185: (utmy, ">i4"),
+                                                         189: (iline, ">i4"),
+                                                         193: (xline, ">i4")})
+
+        print(f"Successful construction. Gradient file path: ({self.survey.gradient_path})")
                     
         # Making copies of the new segy
-        copyfile(Survey.gradient_path, Survey.intercept_path)
-        print(f"Successful construction. Intercept file path: ({Survey.intercept_path})")
-        copyfile(Survey.gradient_path, Survey.rvalue_path)
-        print(f"Successful construction. Correlation coeficient file path: ({Survey.rvalue_path})")
-        copyfile(Survey.gradient_path, Survey.pvalue_path)
-        print(f"Successful construction. Pvalue file path: ({Survey.pvalue_path})")
-        copyfile(Survey.gradient_path, Survey.stderr_path)
-        print(f"Successful construction. Standard Deviation file path: ({Survey.stderr_path})")
+        _copy_file(self.survey.gradient_path, self.survey.intercept_path)
+        print(f"Successful construction. Intercept file path: ({self.survey.intercept_path})")
+        _copy_file(self.survey.gradient_path, self.survey.rvalue_path)
+        print(f"Successful construction. Correlation coeficient file path: ({self.survey.rvalue_path})")
+        _copy_file(self.survey.gradient_path, self.survey.stderr_path)
+        print(f"Successful construction. Standard Error file path: ({self.survey.stderr_path})")
 
         return ("Files constructed successfully")
     
@@ -250,108 +908,50 @@ class AVOModule(WiggleModule):
                 - Angle range of the data is lower than 30*.
                 - Lack of a dense volume of seismic data (traces per gather).
             
-            The linear regression will be made by samples using Scipy's linear regression method that
-            allows to compute statistic parameters such as correlation coefficient, p-value and standard
-            error along with gradient and intercept attributes. After the computation, results are stored 
-            in the trace field of the respective SEG-Y file.
+            The linear regression is solved for every sample of every trace of an inline at once
+            through the closed-form least squares expressions (the same ones used by Scipy's
+            linregress), which allows to compute the correlation coefficient and the standard error
+            along with gradient and intercept attributes. P-value is derived from the gradient and 
+            the standard error when the attributes are organized. Results are returned to the process manager, which stores them
+            in the trace field of the respective SEG-Y file as a contiguous block of traces.
         
         ARGUMENTS
         ---------
             The following arguments can be given manually but it's recommended to use the
-            generator of the index_generator function. Arguments: 
-
-                Survey.merge_path : str class attribute
-                    Path where the merge of the PAS is located.
-
-                Survey.gradient_path : str class attribute
-                    Path where the computation of the "Gradient" will be stored.
-
-                Survey.intercept_path : str class attribute
-                    Path where the computation of the "Intercept" will be stored.
-
-                Survey.rvalue_path : str class attribute
-                    Path where the computation of the "Correlation Coefficient" will be
-                    stored.
-
-                Survey.pvalue_path : str class attribute
-                    Path where the computation of the "P Value" will be stored.
+            generator of the index_generator function. The merge path and the angle list are
+            read from the worker globals installed by _init_worker. Arguments: 
 
-                Survey.stderr_path : str class attribute
-                    Path where the computation of the "Standard Error" will be stored.
-
-                Survey.angle_list : list class attribute
-                    List of the average angle of each PAS. None by default. If the value it's 
-                    different from none, a constructor will create the list by using
-                    angle_interval and the amount of files in gathers_path.
-
-                inlines : list instance attribute 
-                    List of inlines (numbers) within the survey.
-
-                crosslines : list instance attribute
-                    List of crosslines (numbers) within the survey. 
+                iline_number : int
+                    Number of the inline to be computed.
 
                 trace_index : int
-                    Number of the trace within the SEG-Y file.
+                    Number of the first trace of the inline within the attribute SEG-Y files. The
+                    inline starts at trace_index * len(Survey.angle_list) in the merge.
                 
         RETURN
         ------
-            str
-                A message describing the finalization of the process.           
+            trace_index : int
+                Number of the first trace of the inline within the attribute SEG-Y files.
+
+            attributes : (Numpy)ndarray
+                Gradient, intercept, correlation coefficient and standard error of each crossline of
+                the inline. Shape: (4, crosslines, samples).
         
         """
         
-        merge_path, gradient_path, intercept_path, rvalue_path, pvalue_path, stderr_path, angle_list, iline_number, xline_number, trace_index = index_args
-        
-        # sin(angle) list - Extract from this function
-        sins = [np.sin(np.radians(angle)) * np.sin(np.radians(angle)) for angle in angle_list]
-        
-        # Sin array
-#         sina = np.full((len(segy_file.samples), len(segy_file.offsets)), sins)
-        
-        with segyio.open(merge_path) as segy_file:
-    
-            # Array to store regression
-            gradient = np.zeros([len(segy_file.samples), ], dtype = "float32")
-            intercept = np.zeros([len(segy_file.samples), ], dtype = "float32")
-            rvalue = np.zeros([len(segy_file.samples), ], dtype = "float32")
-            pvalue = np.zeros([len(segy_file.samples), ], dtype = "float32")
-            stderr = np.zeros([len(segy_file.samples), ], dtype = "float32")
-     
-            # From gather to matrix
-            for angle in angle_list:
-
-                # First angle shall initialize the matrix from segyio
-                if angle == angle_list[0]:
-                    amp = segy_file.gather[iline_number, xline_number, angle].reshape(len(segy_file.samples), 1)
-
-                # The rest of the angles, concatenate the amplitudes into the matrix.
-                else:
-                    amp = np.concatenate((amp, segy_file.gather[iline_number, xline_number, angle].reshape(len(segy_file.samples), 1)),
-                                         axis=1)
-                
-        # Calculation of intercept, gradient and statistical parameters
-        # To do: vectorize this function
-        for row in range(amp.shape[0]):
-            gradient[row], intercept[row], rvalue[row], pvalue[row], stderr[row] = stats.linregress(sins, amp[row])
+        iline_number, trace_index = index_args
         
-        # Store in segys whatever was computed before
-        with segyio.open(gradient_path, "r+") as gradient_segy:
-            gradient_segy.trace[trace_index] = gradient
-
-        with segyio.open(intercept_path, "r+") as intercept_segy:
-            intercept_segy.trace[trace_index] = intercept
-
-        with segyio.open(rvalue_path, "r+") as rvalue_segy:
-            rvalue_segy.trace[trace_index] = rvalue
-
-        with segyio.open(pvalue_path, "r+") as pvalue_segy:
-            pvalue_segy.trace[trace_index] = pvalue
-
-        with segyio.open(stderr_path, "r+") as stderr_segy:
-                stderr_segy.trace[trace_index] = stderr
+        # Moments of the sin² axis, shared by every sample of the survey
+        x_dev, ssx, x_mean = _sins(tuple(_worker_angle_list))
         
-        print(f"AVO attributes for trace number {trace_index}, [{iline_number},{xline_number}], has been stored successfully")
-        return("Seismic attributes computation ended successfully")
+        # Amplitudes of the inline, the following one is read meanwhile. Shape (crosslines, angles, samples)
+        amp = _prefetch_inline(_worker_merge_path, trace_index)
+
+        # Calculation of intercept, gradient and statistical parameters (compiled, one trace per core,
+        # or on the CUDA device)
+        # Array to store regression: gradient, intercept, rvalue, serror
+        kernel = _gpu_kernel if _worker_gpu else _avo_kernel_for(amp.shape[1])
+        return (trace_index, np.stack(kernel(amp, x_dev, ssx, x_mean)))
       
     def index_generator(self):
         
@@ -367,29 +967,6 @@ class AVOModule(WiggleModule):
             
         ARGUMENTS
         ---------
-            Survey.merge_path : str class attribute
-                Path where the merge of the PAS is located.
-
-            Survey.gradient_path : str class attribute
-                Path where the computation of the "Gradient" will be stored.
-
-            Survey.intercept_path : str class attribute
-                Path where the computation of the "Intercept" will be stored.
-
-            Survey.rvalue_path : str class attribute
-                Path where the computation of the "Correlation Coefficient" will be stored.
-
-            Survey.pvalue_path : str class attribute
-                Path where the computation of the "P Value" will be stored.
-
-            Survey.stderr_path : str class attribute
-                Path where the computation of the "Standard Error" will be stored.
-
-            Survey.angle_list : list class attribute
-                List of the average angle of each PAS. None by default. If the value it's different
-                from none, a constructor will create the list by using angle_interval and the
-                amount of files in gathers_path.
-
             inlines : list instance attribute 
                 List of inlines (numbers) within the survey.
 
@@ -397,21 +974,19 @@ class AVOModule(WiggleModule):
                 List of crosslines (numbers) within the survey. 
 
             trace_index : int
-                Number of the trace within the SEG-Y file.
+                Number of the first trace of each inline within the attribute SEG-Y files.
                 
         YIELDS
         ------
-            list
-                List of arguments for attributes_computation method.
+            tuple
+                Inline number and index of its first trace: the arguments of attributes_computation
+                method, one per inline.
         """
         
         trace_index = 0
         for iline_number in self.inlines:
-            for xline_number in self.crosslines:
-                    yield [Survey.merge_path, Survey.gradient_path, Survey.intercept_path, 
-                           Survey.rvalue_path, Survey.pvalue_path, Survey.stderr_path, 
-                           Survey.angle_list, iline_number, xline_number, trace_index]
-                    trace_index += 1   
+            yield (iline_number, trace_index)
+            trace_index += len(self.crosslines)
     
     def multiprocess_attributes_computation(self):
         
@@ -425,7 +1000,32 @@ class AVOModule(WiggleModule):
             Employs all machine cores to execute attributes_computation.
 
             Acts as a process manager. Executes attributes_computation method in
-            parallel using machine cores.
+            parallel using machine cores, one inline per task, and stores each returned
+            inline in the attribute SEG-Y files as a contiguous block of traces. The workers are 
+            the survey's ones, kept alive for the following calls.
+
+            When CuPy and a CUDA device are available, the regression runs on the device 
+            instead. The main process feeds the device, one inline at a time.
+
+        ARGUMENTS
+        ---------
+            Survey.merge_path : str instance attribute
+                Path where the merge of the PAS is located. Installed once in each worker.
+
+            Survey.angle_list : (Numpy)array instance attribute
+                Average angle of each PAS. Installed once in each worker.
+
+            Survey.gradient_path : str instance attribute
+                Path where the computation of the "Gradient" will be stored.
+
+            Survey.intercept_path : str instance attribute
+                Path where the computation of the "Intercept" will be stored.
+
+            Survey.rvalue_path : str instance attribute
+                Path where the computation of the "Correlation Coefficient" will be stored.
+
+            Survey.stderr_path : str instance attribute
+                Path where the computation of the "Standard Error" will be stored.
         
         RETURN
         ------
@@ -436,10 +1036,32 @@ class AVOModule(WiggleModule):
         """
         index_args = AVOModule.index_generator(self)
 
-        if __name__ == "__main__":
-            p = Pool(maxtasksperchild = 1)
-            p.map(AVOModule.attributes_computation, index_args, chunksize=1)
-                
+        # One job per inline, a few jobs per worker in each chunk
+        workers = os.cpu_count()
+        chunksize = max(1, len(self.inlines) // (4 * workers))
+
+        with segyio.open(self.survey.gradient_path, "r+") as g, segyio.open(self.survey.intercept_path, "r+") as f:
+            with segyio.open(self.survey.rvalue_path, "r+") as r, segyio.open(self.survey.stderr_path, "r+") as s:
+                # Memory mapped writes; segyio falls back to regular I/O when mapping fails
+                for output in (g, f, r, s):
+                    output.mmap()
+                if _gpu_available():
+                    # The main process feeds the device
+                    _init_worker(self.survey.merge_path, self.survey.angle_list, gpu = True)
+                    results = map(AVOModule.attributes_computation, index_args)
+                else:
+                    # Survey's persistent workers. Paths and angles are installed and the kernel 
+                    # compiled once per worker, tasks only carry the inline
+                    executor = self.survey._pool(_init_worker, (self.survey.merge_path, self.survey.angle_list))
+                    results = executor.map(AVOModule.attributes_computation, index_args, chunksize = chunksize)
+
+                for trace_index, attributes in results:
+                    # Writing the whole inline as a contiguous block of traces
+                    for segy_file, attribute in zip([g, f, r, s], attributes):
+                        segy_file.trace[trace_index:trace_index + len(attribute)] = attribute
+
+                    print(f"AVO attributes for traces {trace_index} to {trace_index + len(attribute) - 1} have been stored successfully")
+            
         return(f"Seismic attributes computation ended successfully")
         
     def attributes_organization(self, inline_range, crossline_range, time_window):
@@ -452,23 +1074,33 @@ class AVOModule(WiggleModule):
         DESCRIPTION
         -----------
             Slices and stores in a DataFrame AVO attributes and statistic parameters.
+
+            The stored attributes within the window are read as one block of raw traces per inline
+            and file. P-value is not stored, it is derived from the gradient, the standard error 
+            and the amount of angles of the slice.
             
         ARGUMENTS
         ---------
-            Survey.gradient_path : str class attribute
-                Path where the computation of the "Gradient" will be stored.
+            Survey.gradient_path : str instance attribute
+                Path where the computation of the "Gradient" is stored.
 
-            Survey.intercept_path : str class attribute
-                Path where the computation of the "Intercept" will be stored.
+            Survey.intercept_path : str instance attribute
+                Path where the computation of the "Intercept" is stored.
 
-            Survey.rvalue_path : str class attribute
-                Path where the computation of the "Correlation Coefficient" will be stored.
+            Survey.rvalue_path : str instance attribute
+                Path where the computation of the "Correlation Coefficient" is stored.
 
-            Survey.pvalue_path : str class attribute
-                Path where the computation of the "P Value" will be stored.
+            Survey.stderr_path : str instance attribute
+                Path where the computation of the "Standard Error" is stored.
 
-            Survey.stderr_path : str class attribute
-                Path where the computation of the "Standard Error" will be stored.
+            Survey.angle_list : (Numpy)array instance attribute
+                Average angle of each PAS.
+
+            inlines : list instance attribute 
+                List of inlines (numbers) within the survey.
+
+            crosslines : list instance attribute
+                List of crosslines (numbers) within the survey. 
 
             inline_range : tuple
                 Range of inlines samples to be plotted. Can be given manually or by Panel's
@@ -499,52 +1131,66 @@ class AVOModule(WiggleModule):
             
         """
         
-        with segyio.open(Survey.gradient_path, "r") as g, segyio.open(Survey.intercept_path, "r") as f:
-            with segyio.open(Survey.rvalue_path, "r") as r, segyio.open(Survey.pvalue_path, "r") as p:
-                with segyio.open(Survey.stderr_path, "r") as s:
-                
-                    # Making an array of inlines and crosslines following the trace sorting
-                    ilines = g.attributes(segyio.TraceField.INLINE_3D)[:] 
-                    xlines = g.attributes(segyio.TraceField.CROSSLINE_3D)[:]
-
-                    # Extracting the index of those traces within the line range
-                    ilines = np.array(np.where((ilines >= inline_range[0]) & (ilines <= inline_range[-1])))
-                    xlines = np.array(np.where((xlines >= crossline_range[0]) & (xlines <= crossline_range[-1])))
-
-                    # Intersection of traces between both ranges
-                    trace_index = np.intersect1d(ilines, xlines)
-                    
-                    # index of the time window
-                    time_slice = np.where((g.samples>=time_window[0]) & (g.samples<=time_window[-1]))
-                    
-                    # dataframe for seismic and statistic data
-                    df = pd.DataFrame([])
-                    for trace in trace_index:
-                        df = pd.concat([df, pd.DataFrame({"inline":g.header[trace][189],
-                                                          "crossline": g.header[trace][193],
-                                                          "utmx":g.header[trace][181], 
-                                                          "utmy":g.header[trace][185],
-                                                          "time_slice":g.samples[time_slice],
-                                                          "gradient":g.trace[trace][time_slice],
-                                                          "intercept":f.trace[trace][time_slice],
-                                                          "rvalue":r.trace[trace][time_slice],
-                                                          "pvalue":p.trace[trace][time_slice], 
-                                                          "serror":s.trace[trace][time_slice],
-                                                          "scalar" : g.header[trace][71]})],
-                                               ignore_index = True, axis="rows")
-               
-            # Adapting the coordinates to the segy's scalar value
-            df['utmx'] = np.where(df['scalar'] == 0, df['utmx'],
-                                    np.where(df['scalar'] > 0, df['utmx'] * df['scalar'], 
-                                                                df['utmx'] / abs(df['scalar'])))
-            df['utmy'] = np.where(df['scalar'] == 0, df['utmy'],
-                                    np.where(df['scalar'] > 0, df['utmy'] * df['scalar'], 
-                                                                df['utmy'] / abs(df['scalar'])))
-
-            # Dropping the scalar column
-            df = df.drop(["scalar"], axis = 1)                        
+        # Attribute files stay open (and memory mapped) in this process for the following windows
+        g, f, r, s = (_segy_handle(path) for path in (self.survey.gradient_path, self.survey.intercept_path, 
+                                                       self.survey.rvalue_path, self.survey.stderr_path))
+        n_xlines = len(self.crosslines)
+
+        # Attribute files are sorted by inline - crossline, so the traces within both line 
+        # ranges form a rectangle of the survey grid
+        il_lo, il_hi = np.searchsorted(self.inlines, inline_range[0], side = "left"), \
+                       np.searchsorted(self.inlines, inline_range[-1], side = "right")
+        xl_lo, xl_hi = np.searchsorted(self.crosslines, crossline_range[0], side = "left"), \
+                       np.searchsorted(self.crosslines, crossline_range[-1], side = "right")
+        trace_index = (np.arange(il_lo, il_hi)[:, None] * n_xlines + np.arange(xl_lo, xl_hi)[None, :]).ravel()
+        
+        # index of the time window
+        time_slice = np.where((g.samples>=time_window[0]) & (g.samples<=time_window[-1]))[0]
+        n_traces, n_times = len(trace_index), len(time_slice)
+        
+        # Headers of the traces within the ranges
+        inline = g.attributes(segyio.TraceField.INLINE_3D)[trace_index]
+        crossline = g.attributes(segyio.TraceField.CROSSLINE_3D)[trace_index]
+        utmx = g.attributes(segyio.TraceField.CDP_X)[trace_index]
+        utmy = g.attributes(segyio.TraceField.CDP_Y)[trace_index]
+        scalar = g.attributes(segyio.TraceField.SourceGroupScalar)[trace_index]
+
+        # Time window of each attribute, one block of raw traces per inline and file
+        n_gathers = xl_hi - xl_lo
+        attributes = np.zeros((4, n_traces, n_times), dtype = "float32")
+        for attribute, segy_file in zip(attributes, [g, f, r, s]):
+            for position, il in enumerate(range(il_lo, il_hi)):
+                first_trace = il * n_xlines + xl_lo
+                attribute[position * n_gathers:(position + 1) * n_gathers] = \
+                    segy_file.trace.raw[first_trace:first_trace + n_gathers][:, time_slice]
+
+        # P-value derived from the stored attributes, n angles give n - 2 degrees of freedom. The 
+        # t statistic is the gradient over its standard error, both stored as they were computed,
+        # so it does not lose precision when |r| is close to 1. Exact fits give an infinite t 
+        # (p-value 0) and constant amplitudes an undefined one
+        gradient, intercept, rvalue, serror = attributes
+        df_freedom = len(self.survey.angle_list) - 2
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            t = gradient.astype("float64") / serror
+            pvalue = (2 * stats.t.sf(np.abs(t), df_freedom)).astype("float32")
+
+        # Adapting the coordinates to the segy's scalar value
+        factor = np.where(scalar > 0, scalar, 1.0 / np.where(scalar < 0, -scalar, 1))
+
+        # dataframe for seismic and statistic data, one row per sample. Columns wrap the arrays
+        # as they are, without being copied into consolidated blocks
+        df = pd.DataFrame({"inline": np.repeat(inline, n_times),
+                           "crossline": np.repeat(crossline, n_times),
+                           "utmx": np.repeat(utmx * factor, n_times), 
+                           "utmy": np.repeat(utmy * factor, n_times),
+                           "time_slice": np.tile(g.samples[time_slice], n_traces),
+                           "gradient": gradient.ravel(),
+                           "intercept": intercept.ravel(),
+                           "rvalue": rvalue.ravel(),
+                           "pvalue": pvalue.ravel(), 
+                           "serror": serror.ravel()}, copy = False)
        
-            return df
+        return df
         
     def crossplot(self, dataframe, x_column, y_column, scale_select_value):
         
@@ -582,7 +1228,8 @@ class AVOModule(WiggleModule):
         RETURN
         ------
             layout : Holviews element [NdLayout]
-                Crossplot and map of the points selected in the crossplot.
+                Crossplot and map of the points selected in the crossplot. Crossplots of more than
+                _RASTERIZE_POINTS samples are rasterized when Datashader is installed.
         
         FUNCTIONS
         ---------
@@ -592,27 +1239,41 @@ class AVOModule(WiggleModule):
 
         """
         
+        # Plotted columns as arrays and their limits (NaN skipped), one pass per column
+        x, y, scale = (dataframe[column].to_numpy() for column in (x_column, y_column, scale_select_value))
+        (x_min, x_max), (y_min, y_max), (scale_min, scale_max) = (_limits(values) for values in (x, y, scale))
+
         # Scale for the crossplot
-        levels = np.linspace(dataframe[scale_select_value].min(),
-                             dataframe[scale_select_value].max(), 100,
-                             endpoint = True).tolist()
+        levels = np.linspace(scale_min, scale_max, 100, endpoint = True).tolist()
 
-        # Preparing the data's plot
-        data = hv.Points(dataframe, [x_column, y_column], vdims = scale_select_value)
-        data.opts(title = f"{x_column} vs {y_column}",
-                  color = scale_select_value, color_levels = levels, cmap = "fire", colorbar = True)
+        # Preparing the data's plot, straight from the arrays. Points keep the dataframe's order
+        data = hv.Points((x, y, scale), [x_column, y_column], vdims = scale_select_value)
+        
+        if hd is not None and len(dataframe) > _RASTERIZE_POINTS:
+            # Large windows: every pixel shows the mean of the samples falling in it
+            data = hd.rasterize(data, aggregator = ds.mean(scale_select_value))
+            data.opts(title = f"{x_column} vs {y_column}",
+                      cmap = "fire", cnorm = "eq_hist", colorbar = True, tools = ["box_select"])
+            
+            # Declare the box of the raster as source of selection stream
+            selection = streams.BoundsXY(source = data)
+        
+        else:
+            data.opts(title = f"{x_column} vs {y_column}",
+                      color = scale_select_value, color_levels = levels, cmap = "fire", colorbar = True,
+                      backend_opts = {"plot.output_backend": "webgl"})
+            
+            # Declare points as source of selection stream
+            selection = streams.Selection1D(source = data)
 
         # Axis of plot
-        x_axis = hv.Curve([(0,dataframe[y_column].min()), (0,dataframe[y_column].max())])
+        x_axis = hv.Curve([(0, y_min), (0, y_max)])
         x_axis.opts(color = "black", line_width = 0.5)
-        y_axis = hv.Curve([(dataframe[x_column].min(), 0), (dataframe[x_column].max(), 0)])
+        y_axis = hv.Curve([(x_min, 0), (x_max, 0)])
         y_axis.opts(color = "black", line_width = 0.5)
 
-        # Declare points as source of selection stream
-        selection = streams.Selection1D(source = data)
-
         # Write function that uses the selection indices to slice points and compute stats
-        def selected_info(index):
+        def selected_info(index = [], bounds = None):
             
             """
             NAME
@@ -625,8 +1286,12 @@ class AVOModule(WiggleModule):
                 
             ARGUMENTS
             ---------
-                hc : (Pandas)DataFrame
-                    DataFrame made by converting selected samples of the crossplot.
+                index : list
+                    Indices of the selected samples in the crossplot.
+
+                bounds : tuple
+                    Box (left, bottom, right, top) selected in a rasterized crossplot. None by
+                    default.
             
             RETURN
             ------
@@ -635,7 +1300,11 @@ class AVOModule(WiggleModule):
                 
             """
             
-            hc = dataframe.iloc[index]
+            if bounds is not None:
+                hc = dataframe[dataframe[x_column].between(bounds[0], bounds[2]) &
+                               dataframe[y_column].between(bounds[1], bounds[3])]
+            else:
+                hc = dataframe.iloc[index]
             plot = hv.Scatter(hc, ["utmx","utmy"])
             plot.opts(color = "red", size = 5, 
                       fontsize = {"title": 16, "labels": 14, "xticks": 7, "yticks": 7},
@@ -664,7 +1333,8 @@ class AVOModule(WiggleModule):
             Creates a Column layout with the result of the crossplot function and a seismic line while 
             providing interactive methods to inspect the plotted data.
 
-            Displays the mentioned plots along Panel's widgets to ease data manipulation.
+            Displays the mentioned plots along Panel's widgets to ease data manipulation. The layout
+            is built once and stored in the visualization attribute; following calls return it.
             
         ARGUMENTS
         ---------
@@ -700,10 +1370,14 @@ class AVOModule(WiggleModule):
                             [2] RadioButtonGroup for the selection of a seismic direction.
                             [3] TextInput for input of inline number.
                             [4] TextInput for input of crossline number.
+                            [5] RadioButtonGroup for the selection of the line rendering.
                         [1] Lines.
                         
         FUNCTIONS
         ---------
+            window_attributes(**kwargs)
+                Cached attributes_organization of the last 16 windows.
+
             avo_stuff(**kwargs)
                 Plots crossplot and a map of crossplot selected data.
 
@@ -716,22 +1390,27 @@ class AVOModule(WiggleModule):
         
         """
         
-        df = pd.DataFrame(columns = ["inline","crossline","time_slice",
-                                     "gradient","intercept","rvalue","pvalue","serror"])
+        # Widgets and plots are built once, later calls display the same layout
+        if self.visualization is not None:
+            return self.visualization
+
+        # Survey limits
+        il_min, il_max = int(self.inlines.min()), int(self.inlines.max())
+        xl_min, xl_max = int(self.crosslines.min()), int(self.crosslines.max())
         
         # Window Selection
         inst = pn.widgets.StaticText(name = "Window to work with", value = "")
 
         iline_range = pn.widgets.IntRangeSlider(name = 'Inline range',
-                                                start = int(self.inlines.min()), 
-                                                end = int(self.inlines.max()), 
-                                                value = (int(self.inlines.min()), int(self.inlines.min())+1), 
+                                                start = il_min, 
+                                                end = il_max, 
+                                                value = (il_min, il_min + 1), 
                                                 step = 1)
 
         xline_range = pn.widgets.IntRangeSlider(name = 'Crossline range',
-                                                start = int(self.crosslines.min()), 
-                                                end = int(self.crosslines.max()), 
-                                                value = (int(self.crosslines.min()), int(self.crosslines.min())+1), 
+                                                start = xl_min, 
+                                                end = xl_max, 
+                                                value = (xl_min, xl_min + 1), 
                                                 step = 1)
 
         # Time slice selection
@@ -745,15 +1424,15 @@ class AVOModule(WiggleModule):
         # Crossplot parameters
         axis = pn.widgets.StaticText(name = "Crossplots", value = "")
         x_axis = pn.widgets.Select(name = "X axis", 
-                                  options = list(df.columns),
+                                  options = list(_AVO_COLUMNS),
                                   value = "intercept")
         y_axis = pn.widgets.Select(name = "Y axis", 
-                                  options = list(df.columns),
+                                  options = list(_AVO_COLUMNS),
                                   value = "gradient")
 
         # Scale selection
         select_scale = pn.widgets.Select(name = "Color scale", 
-                                        options = list(df.columns),
+                                        options = list(_AVO_COLUMNS),
                                         value = "serror")
 
         # Buttons
@@ -771,10 +1450,52 @@ class AVOModule(WiggleModule):
         # display line
         checkbox = pn.widgets.Checkbox(name = "Check to display a line")
 
+        # Line rendering: Bokeh glyphs or a Datashader image (wide lines, needs Datashader)
+        render_buttons = pn.widgets.RadioButtonGroup(name = 'Line rendering',
+                                                     options = ['Bokeh', 'Datashader'], button_type = 'success',
+                                                     disabled = hd is None)
+
+
+        # Last inputs and plot of avo_stuff and line_stuff, to skip events that change nothing
+        rendered = {"avo": (None, None), "line": (None, None)}
+
+        @lru_cache(maxsize = 16)
+        def window_attributes(iline_range, xline_range, time_slice):
+            
+            """
+            NAME
+            ----
+                window_attributes.
+                
+            DESCRIPTION
+            -----------
+                Cached attributes_organization. Keyed by the window, so changing the axes or the 
+                color scale of the crossplot only redraws it.
+                
+            ARGUMENTS
+            ---------
+                inline_range : tuple
+                    Range of inlines samples to be plotted.
+
+                crossline_range : tuple
+                    Range of crosslines samples to be plotted.
+
+                time_window : tuple
+                    Time slice of interest. 
+
+            RETURN
+            ------
+                (Pandas)DataFrame
+                    Result of attributes_organization. Must not be modified.
+            
+            """
+            
+            return AVOModule.attributes_organization(self, iline_range, xline_range, time_slice)
 
         # Decorator to mess up with the API
-        @pn.depends(iline_range.param.value, xline_range.param.value,
-                    time_slice.param.value,
+        # Sliders trigger the plots once released, not on every value crossed while dragging
+        @pn.depends(iline_range.param.value_throttled, xline_range.param.value_throttled,
+                    time_slice.param.value_throttled,
                     x_axis.param.value, y_axis.param.value,
                     select_scale.param.value)
         def avo_stuff(iline_range, xline_range, time_slice,
@@ -821,17 +1542,22 @@ class AVOModule(WiggleModule):
             
             """
             
-            attribute_dataframe = AVOModule.attributes_organization(self, iline_range, xline_range, time_slice)
+            key = (tuple(iline_range), tuple(xline_range), tuple(time_slice), x_axis, y_axis, select_scale)
+            if rendered["avo"][0] == key:
+                return rendered["avo"][1]
+
+            attribute_dataframe = window_attributes(tuple(iline_range), tuple(xline_range), tuple(time_slice))
 #             # Crossplot stuff
             crossplots = AVOModule.crossplot(self, attribute_dataframe, x_axis, y_axis, select_scale)
 
-            return(crossplots).opts(merge_tools=False)
+            rendered["avo"] = (key, crossplots.opts(merge_tools=False))
+            return rendered["avo"][1]
         
-        @pn.depends(time_slice.param.value,
+        @pn.depends(time_slice.param.value_throttled,
                     seismic_buttons.param.value,
                     iline_input.param.value, xline_input.param.value,
-                    checkbox.param.value)
-        def line_stuff(time_slice, seismic_buttons, iline_input, xline_input, checkbox):
+                    checkbox.param.value, render_buttons.param.value)
+        def line_stuff(time_slice, seismic_buttons, iline_input, xline_input, checkbox, render_buttons):
             
             """
             NAME
@@ -868,48 +1594,59 @@ class AVOModule(WiggleModule):
                 time_slice : list
                      Time slice of interest. 
 
+                render_buttons : str
+                     "Bokeh" draws the line as glyphs. "Datashader" draws its wavelets into an
+                     image on the server, so the browser receives the same payload whatever the 
+                     amount of traces.
+
                 Survey.merge_path : str
                     Path where the merge of the PAS is located.
             
             RETURN
             ------
-                GridSpace : Holviews element [GridSpace]
-                    A grid compounded by angle gathers.
+                grid : Holviews element [Overlay]
+                    The angle gathers of the line, side by side.
             
             """
             
+            key = (tuple(time_slice), seismic_buttons, iline_input, xline_input, checkbox, render_buttons)
+            if rendered["line"][0] == key:
+                return rendered["line"][1]
+
+            grid = None
             if checkbox:
-                with segyio.open(Survey.merge_path) as segy:
-                    self.interpolation = False
-                    gather_dict = {}
-                    # Storing scaling fac
-                    self.scaling_factor = WiggleModule.scaling_factor(self, segyio.tools.collect(segy.trace[:]))
-
-                    # Storing time array
-                    WiggleModule.time(self, int(segy.attributes(segyio.TraceField.TRACE_SAMPLE_INTERVAL)[0]/1000))
-
-                    # Line visualization
-                    if seismic_buttons == "Inline":
-                        trace_counter = self.crosslines[0]
-                        for gather in segy.gather[int(iline_input),:, :]:
-                            gather_dict[f"{int(iline_input)}/{trace_counter}"] = WiggleModule.wiggle_plot(self, 
-                                                                                                          gather, time_slice, 
-                                                                                                          "Colored wiggle")
-                            trace_counter += 1
-
-                    else: 
-                        trace_counter = self.inlines[0]
-                        for gather in segy.gather[:, int(xline_input), :]:
-                            gather_dict[f"C{trace_counter}/{int(xline_input)}"] = WiggleModule.wiggle_plot(self, 
-                                                                                                           gather, time_slice, 
-                                                                                                           "Colored wiggle")
-                            trace_counter += 1
-                
-                grid = hv.GridSpace(gather_dict, kdims=['Trace'])
+                # The merge file stays open in this process between events
+                segy = _segy_handle(self.survey.merge_path)
+                self.interpolation = False
+                # Storing scaling fac, scanned once per object: the survey builds a new one 
+                # when the merge is organized again
+                if self.scaling_fac is None:
+                    self.scaling_fac = _peak_amplitude(self.survey.merge_path)
+
+                # Storing time array, at the sample interval read by Survey.cube_data_organization
+                WiggleModule.time(self, self.sample_interval)
+
+                # Line visualization, read at once. Shape (gathers, angles, samples)
+                if seismic_buttons == "Inline":
+                    il = int(iline_input)
+                    line = segyio.tools.collect(segy.gather[il, :, :])
+                    names = [f"{il}/{xline}" for xline in range(self.crosslines[0], self.crosslines[0] + len(line))]
+
+                else: 
+                    xl = int(xline_input)
+                    line = segyio.tools.collect(segy.gather[:, xl, :])
+                    names = [f"C{iline}/{xl}" for iline in range(self.inlines[0], self.inlines[0] + len(line))]
+
+                if render_buttons == "Datashader" and hd is not None:
+                    grid = hd.datashade(WiggleModule.line_plot(self, line, names, time_slice, "Wavelet"), 
+                                        cmap = ["black"])
+                else:
+                    grid = WiggleModule.line_plot(self, line, names, time_slice, "Colored wiggle")
                 grid.opts(fontsize = {"title": 16, "labels": 14, "xticks": 8, "yticks": 8},
-                          plot_size = (60, 240))
+                          width = 60 * len(names) + 100, height = 300)
                 
-                return grid
+            rendered["line"] = (key, grid)
+            return grid
 
         # Widget construction    
         avo_widgets = pn.WidgetBox(f"## AVO visualization", 
@@ -917,7 +1654,7 @@ class AVOModule(WiggleModule):
                                   width = 250)
     
         line_widgets = pn.WidgetBox(f"## Line visualization", 
-                                       checkbox, seismic_buttons, iline_input, xline_input,
+                                       checkbox, seismic_buttons, iline_input, xline_input, render_buttons,
                                    width = 250)
         
         def bg_widgets(event):
@@ -957,4 +1694,5 @@ class AVOModule(WiggleModule):
         avo = pn.Row(avo_widgets, avo_stuff).servable()
         line = pn.Row(line_widgets, line_stuff).servable()
         
-        return pn.Column(avo, line)
+        self.visualization = pn.Column(avo, line)
+        return self.visualization
@@ -5,7 +5,6 @@ from shutil import copyfile
 
 # Calc
 import numpy as np
-import pandas as pd
 
 # Visualization
 import holoviews as hv
@@ -13,12 +12,87 @@ from holoviews import opts
 from bokeh.models import HoverTool
 from holoviews import streams
 import panel as pn 
+import param
+
+# Rasterized wells (optional)
+try:
+    import datashader as ds
+    import holoviews.operation.datashader as hd
+except ImportError:
+    ds = hd = None
 
 # Visualization platform
 hv.extension('bokeh')
+# Basemap glyphs drawn with WebGL
+hv.renderer('bokeh').webgl = True
+
+# Holoviews default config
+_PLOT_TOOLS = ['pan','wheel_zoom','reset']
+_FONT_S = {"title": 16, "labels": 14, "xticks": 10, "yticks": 10}
+_DEFAULTS = (opts.Curve(tools = _PLOT_TOOLS, default_tools=[],
+                        xformatter = '%.0f', yformatter = '%.0f',
+                        fontsize = _FONT_S,
+                        height = 400, width = 400, padding = 0.1,
+                        toolbar = 'right'),
+             opts.Scatter(tools = _PLOT_TOOLS, default_tools=[],
+                          xformatter = '%.0f', yformatter = '%.0f', 
+                          fontsize = _FONT_S,
+                          height = 400, width = 400, padding = 0.1,
+                          toolbar = 'right',
+                          framewise = True, show_grid = True),
+             opts.GridSpace(fontsize = _FONT_S,
+                            shared_yaxis = True,
+                            plot_size = (120, 380),
+                            toolbar = "left"),
+             opts.Overlay(xformatter = '%.0f', yformatter = '%.0f',
+                          fontsize = _FONT_S,
+                          toolbar = "left",
+                          show_grid = True),
+             opts.Points(tools=['box_select', 'lasso_select'], default_tools=[], active_tools = ["box_select"],
+                         size = 3, width = 500, height = 400, padding = 0.01,
+                         fontsize = {'title': 16, 'ylabel': 14, 'xlabel': 14, 'ticks': 10},
+                         framewise = True, show_grid = True,
+                         toolbar = "left"))
+
+# Installed once per session, even if this file is run again
+if not getattr(hv, "_basemap_defaults_installed", False):
+    opts.defaults(*_DEFAULTS)
+    hv._basemap_defaults_installed = True
+
+# Surveys with more wells than this have them rasterized by Datashader, when available
+_RASTERIZE_WELLS = 500
 
 # Code
 
+def _xy_array(dataframe):
+    
+    """
+    NAME
+    ----
+        _xy_array
+        
+    DESCRIPTION
+    -----------
+        Gathers the UTM coordinates of a dataframe as pairs, one row per point. The array is 
+        C-contiguous, so each pair is read from adjacent memory.
+        
+    ARGUMENTS
+    ---------
+        dataframe : (Pandas)DataFrame
+            Matrix with utmx and utmy columns, such as basemap_dataframe or wells_dataframe.
+            
+    RETURN
+    ------
+        (Numpy)array
+            float64 array of shape (points, 2): utmx and utmy of each point.
+            
+    """
+    
+    xy = np.empty((len(dataframe), 2))
+    xy[:, 0] = dataframe["utmx"].to_numpy()
+    xy[:, 1] = dataframe["utmy"].to_numpy()
+    return xy
+
 class BasemapModule:
 
     """
@@ -44,6 +118,9 @@ class BasemapModule:
         wells_dataframe : (Pandas)DataFrame
             Matrix compounded by wells related information. Empty by default.
 
+        survey_name : str
+            Name of the seismic survey.
+
         polygon : Holviews element [Curve]
             Plot of the seismic survey polygon.
 
@@ -54,8 +131,18 @@ class BasemapModule:
             Plot of the seismic lines (Inline referred as iline and Crossline referred as xline) 
             and its intersection.
             
-        basemap : Holviews element [Overlay]
-            Combination of the plots: polygon, wells and seismic_lines.
+        basemap : Holviews element [DynamicMap]
+            Combination of the plots: polygon, wells and seismic_lines. The seismic lines are
+            redrawn through a Holoviews Pipe stream.
+
+        survey_map : tuple
+            Lowest and highest line number of each direction, amount of CDP within crosslines, 
+            coordinates of the lowest inline and crossline and the change of coordinates per line 
+            of each direction. Built by seismic_line_plot on its first call. None by default.
+
+        well_options : tuple
+            Options of the well selector ("None" and the well names) and the line numbers of each 
+            well, keyed by name. Built by get_basemap on its first call. None by default.
         
     METHODS
     -------
@@ -89,41 +176,22 @@ class BasemapModule:
         Panel: BSD open source Python library that allows to create custom interactive dashboards 
                by connecting user defined widgets to plots. More information available at:
                     https://panel.holoviz.org/index.html
+
+        Datashader: BSD licensed graphics pipeline for large datasets. Optional, used to rasterize
+                    the wells of surveys with many of them. More information available at:
+                        https://datashader.org/
        
     ON PROGRESS
     -----------
         Include a GIS element into plots.
     """ 
         
-    # Holoviews default config
-    plot_tools = ['pan','wheel_zoom','reset']
-    font_s = {"title": 16, "labels": 14, "xticks": 10, "yticks": 10}
-    opts.defaults(opts.Curve(tools = plot_tools, default_tools=[],
-                             xformatter = '%.0f', yformatter = '%.0f',
-                             fontsize = font_s,
-                             height = 400, width = 400, padding = 0.1,
-                             toolbar = 'right'),
-                  opts.Scatter(tools = plot_tools, default_tools=[],
-                               xformatter = '%.0f', yformatter = '%.0f', 
-                               fontsize = font_s,
-                               height = 400, width = 400, padding = 0.1,
-                               toolbar = 'right',
-                               framewise = True, show_grid = True),
-                  opts.GridSpace(fontsize = font_s,
-                                 shared_yaxis = True,
-                                 plot_size = (120, 380),
-                                 toolbar = "left"),
-                  opts.Overlay(xformatter = '%.0f', yformatter = '%.0f',
-                               fontsize = font_s,
-                               toolbar = "left",
-                               show_grid = True),
-                  opts.Points(tools=['box_select', 'lasso_select'], default_tools=[], active_tools = ["box_select"],
-                              size = 3, width = 500, height = 400, padding = 0.01,
-                              fontsize = {'title': 16, 'ylabel': 14, 'xlabel': 14, 'ticks': 10},
-                              framewise = True, show_grid = True),
-                              toolbar = "left")
+    # Holoviews config (defaults are installed at module level)
+    plot_tools = _PLOT_TOOLS
+    webgl = {"plot.output_backend": "webgl"}
+    font_s = _FONT_S
     
-    def __init__(self, basemap_dataframe, wells_dataframe):
+    def __init__(self, basemap_dataframe, wells_dataframe, survey_name):
         
         """
         DESCRIPTION
@@ -135,14 +203,28 @@ class BasemapModule:
         
         self.basemap_dataframe = basemap_dataframe
         self.wells_dataframe = wells_dataframe
+        self.survey_name = survey_name
         self.iline_step = 1
         self.xline_step = 1
+        self.survey_map = None
+        self.well_options = None
         self.hover_format = [("Utmx", "$x{(0.00)}"), ("Utmy", "$y{(0.00)}")]
         self.hover_attributes = {"show_arrow": True, 
                                  "point_policy": "follow_mouse", 
                                  "anchor": "bottom_right", 
                                  "attachment": "above", 
                                  "line_policy": "none"} 
+        
+        # Hover tools of wells, lines and intersection (read from the data) and the static plots, built once
+        self.wells_hover = HoverTool(tooltips=[("Well", "@name")] + self.hover_format + [("Depth", "@depth{(0)}")])
+        self.line_hover = HoverTool(tooltips=[("Line", "@kind @number")] + self.hover_format)
+        self.int_hover = HoverTool(tooltips=[("Intersection", "(@iline/@xline)")] + self.hover_format)
+        for item in [self.wells_hover, self.line_hover, self.int_hover]:
+            item._property_values.update(self.hover_attributes)
+        self.polygon = None
+        self.wells = None
+        self.seismic_lines = None
+        self.basemap = None
     
     def polygon_plot(self):
 
@@ -169,11 +251,12 @@ class BasemapModule:
         
         """
 
-        #Plotting the boundaries of the Seismic Survey. Holoviews Curve element
-        BasemapModule.polygon = hv.Curve(self.basemap_dataframe,["utmx","utmy"], label = "Polygon")
-        BasemapModule.polygon.opts(line_width=2, color = "black")
+        #Plotting the boundaries of the Seismic Survey. Holoviews Curve element, built on the first call
+        if self.polygon is None:
+            self.polygon = hv.Curve(self.basemap_dataframe,["utmx","utmy"], label = "Polygon")
+            self.polygon.opts(line_width=2, color = "black", backend_opts = self.webgl)
         
-        return BasemapModule.polygon
+        return self.polygon
  
     def wells_plot(self):
 
@@ -187,7 +270,8 @@ class BasemapModule:
             Constructs the wells attribute
 
             Plots the wells inside the Seismic Survey's polygon using Holoviews and bokeh as
-            backend.
+            backend. Surveys with more than _RASTERIZE_WELLS wells are rasterized when Datashader
+            is installed; the well closest to the cursor is then drawn on top with its hover.
 
         ARGUMENTS
         ---------
@@ -197,20 +281,36 @@ class BasemapModule:
             
         RETURN
         ------
-            BasemapModule.wells : Holviews element [Scatter] instance attribute
+            BasemapModule.wells : Holviews element [Scatter] or [DynamicMap] instance attribute
                 Plot of the wells inside the seismic survey.
             
         """
         
-        # Declaring the Hover tools (each line will use one)
-        wells_hover = HoverTool(tooltips=[("Well", "@name")] + self.hover_format + [("Depth", "@depth{(0)}")])
-        
-        # Plotting Wells. Holoviews Scatter element
-        BasemapModule.wells = hv.Scatter(self.wells_dataframe,["utmx","utmy"],
-                                                   ["name","cdp_iline", "cdp_xline", "depth"], 
-                                                   label = "Wells")
-        BasemapModule.wells.opts(line_width = 1, color = "green", size = 10 ,marker = "^") 
-        return (BasemapModule.wells)                
+        # Plotting Wells, built on the first call
+        if self.wells is None and hd is not None and len(self.wells_dataframe) > _RASTERIZE_WELLS:
+            # Many wells: the browser receives an image of the well count per pixel
+            wells = hv.Points(self.wells_dataframe,["utmx","utmy"],
+                              ["name","cdp_iline", "cdp_xline", "depth"], 
+                              label = "Wells")
+            raster = hd.rasterize(wells, aggregator = ds.count())
+
+            # The well closest to the cursor, drawn with the wells' marker and hover
+            nearest = hd.inspect_points(raster)
+            nearest.opts(line_width = 1, color = "green", size = 10 ,marker = "^", 
+                         tools = [self.wells_hover], backend_opts = self.webgl)
+
+            self.wells = hd.dynspread(raster, threshold = 0.5).opts(cmap = ["green"], clim = (1, None),
+                                                                    clipping_colors = {"min": "transparent"}) 
+            self.wells = self.wells * nearest
+
+        elif self.wells is None:
+            # Holoviews Scatter element
+            self.wells = hv.Scatter(self.wells_dataframe,["utmx","utmy"],
+                                    ["name","cdp_iline", "cdp_xline", "depth"], 
+                                    label = "Wells")
+            self.wells.opts(line_width = 1, color = "green", size = 10 ,marker = "^", 
+                            tools = self.plot_tools + [self.wells_hover], backend_opts = self.webgl) 
+        return (self.wells)                
             
     def seismic_line_plot(self, iline_number, xline_number):
 
@@ -243,8 +343,11 @@ class BasemapModule:
         
         FUNCTIONS
         ---------
-            seismic_lines_dataframe(**kwargs)
-                Builds a DataFrame for the first line either along inline or crossline direction.
+            survey_affine_map(**kwargs)
+                Builds the affine map from line numbers to coordinates of the seismic survey.
+
+            trace_coordinates(**kwargs)
+                Computes the coordinates of a trace given its inline and crossline numbers.
 
             seismic_intersection(**kwargs)
                 Computes the coordinates and tracf of the intersection between two seismic lines.
@@ -256,72 +359,92 @@ class BasemapModule:
             
         """
         
-        def seismic_lines_dataframe(line_direction, perpendicular_direction):
+        def survey_affine_map(iline_arr, xline_arr, utm_arr, limits):
 
             """
             NAME
             ----
-                seismic_lines_dataframe
+                survey_affine_map
                 
             DESCRIPTION
             -----------
-                Builds a DataFrame for the first line either along inline or crossline direction.
+                Builds the affine map from line numbers to coordinates of the seismic survey.
 
-                The coordinates represent the lower end of a seismic line; therefore, these shall be used to
-                draft seismic lines after the computation of the higher end. If the users want to plot a line 
-                along inline direction, the code will compute the coordinates of the traces within the first 
-                crossline and vice versa.
+                The map is compounded by the coordinates of the lowest inline and crossline (origin)
+                and the change of utmx and utmy per inline and per crossline, both derived from the
+                survey's corners. Any trace is then located by vector sums.
 
             ARGUMENTS
             ---------
-            basemap_dataframe : (Pandas)DataFrame
-                Matrix compounded by the coordinates and lines of the seismic survey's corners.
+                iline_arr : (Numpy)array
+                    Inline number of the seismic survey's corners.
 
-            line_direction : str
-                Seismic line direction.
+                xline_arr : (Numpy)array
+                    Crossline number of the seismic survey's corners.
 
-            perpendicular_direction : str
-                Direction in which the points are going to be calculated. Is perpendicular to line_direction 
-                argument.
+                utm_arr : (Numpy)array
+                    utmx and utmy (columns) of the seismic survey's corners.
 
+                limits : dict
+                    Lowest and highest line number of each direction.
 
             RETURN
             ------
-                dlines : (Pandas)DataFrame
-                    Contains the trace coordinates within the first seismic line.
+                origin : tuple
+                    utmx and utmy of the trace at the lowest inline and crossline.
+
+                steps : tuple
+                    Change of utmx and utmy per inline (du_di, dv_di) and per crossline (du_dx, dv_dx).
                     
             """
 
-            # Less stresful to read the code
-            df, ld, p_d = self.basemap_dataframe, line_direction, perpendicular_direction
+            (imin, imax), (xmin, xmax) = limits["iline"], limits["xline"]
 
+            # Corners at the origin and at the end of the first crossline and first inline
+            origin, di_end, dx_end = (utm_arr[np.flatnonzero((iline_arr == iline) & (xline_arr == xline))[0]] 
+                                      for iline, xline in ((imin, xmin), (imax, xmin), (imin, xmax)))
 
-            #Measure the amount of perpendicular lines within line_direction
-            dif_lines = abs(int(df[f"{perpendicular_direction}"].min() - df[f"{perpendicular_direction}"].max())) +1
+            # A survey with a single line along one direction has no step along it
+            (du_di, dv_di), (du_dx, dv_dx) = ((di_end - origin) / ((imax - imin) or 1), 
+                                              (dx_end - origin) / ((xmax - xmin) or 1))
 
-            #Computing the coordinates of each
-            utmx = np.linspace(float(df[(df[ld]==df[ld].min()) & (df[p_d]==df[p_d].min())]["utmx"].unique()), 
-                                float(df[(df[ld]==df[ld].min()) & (df[p_d]==df[p_d].max())]["utmx"].unique()), 
-                                num = dif_lines, endpoint = True)
+            # Python floats: the slider callbacks do scalar arithmetic only
+            return tuple(origin.tolist()), (du_di.item(), du_dx.item(), dv_di.item(), dv_dx.item())
 
-            utmy =  np.linspace(float(df[(df[ld]==df[ld].min()) & (df[p_d]==df[p_d].min())]["utmy"].unique()), 
-                                 float(df[(df[ld]==df[ld].min()) & (df[p_d]==df[p_d].max())]["utmy"].unique()), 
-                                 num = dif_lines, endpoint = True)
+        
+        def trace_coordinates(iline_number, xline_number):
 
-            #Array of perpendiculars
-            array = np.arange(df[f"{p_d}"].min(),
-                              df[f"{p_d}"].max() + 1,
-                              1)
+            """
+            NAME
+            ----
+                trace_coordinates
+                
+            DESCRIPTION
+            -----------
+                Computes the coordinates of a trace given its inline and crossline numbers through
+                the survey's affine map.
 
-            # Making dataframes to ease further calculations
-            dlines = pd.DataFrame({ld: df[f"{ld}"].min(),
-                                   p_d: array,
-                                   "utmx": utmx, "utmy": utmy})
+            ARGUMENTS
+            ---------
+                iline_number : int
+                    Inline number of the trace.
 
-            return(dlines)
+                xline_number : int
+                    Crossline number of the trace.
 
+            RETURN
+            ------
+                list
+                    utmx and utmy of the trace.
         
-        def seismic_intersection(iline_df, xline_df, iline_number, xline_number):
+            """
+            
+            di, dx = iline_number - imin, xline_number - xmin
+
+            return [utmx0 + du_di * di + du_dx * dx, utmy0 + dv_di * di + dv_dx * dx]
+
+        
+        def seismic_intersection(iline_number, xline_number):
             
             """
             NAME
@@ -332,16 +455,8 @@ class BasemapModule:
             -----------
                 Computes the coordinates and tracf of the intersection between two seismic lines.
 
-                The computation of the intersection uses vector differences.
-
             ARGUMENTS
             ---------
-                iline_df : (Pandas)DataFrame
-                    Coordinates of the traces within the first crossline.
-
-                xline_df : (Pandas)DataFrame
-                    Coordinates of the traces within the first inline.
-
                 iline_number : int
                     Number of the chosen inline. 
 
@@ -354,63 +469,59 @@ class BasemapModule:
                     List of tracf and coordinates of the intersection.
         
             """
-            # Amount of CDP within crosslines
-            dif_lines = abs(self.basemap_dataframe["xline"].max() - self.basemap_dataframe["xline"].min()) + 1
+            # tracf. The amount of CDP within crosslines is computed once with the survey map
+            tracf = (iline_number - imin) * dif_xlines + (xline_number - xmin) + 1
 
-            # tracf
-            tracf = (iline_number - self.basemap_dataframe["iline"].min()) * dif_lines + (xline_number - self.basemap_dataframe["xline"].min()) + 1
+            return [int(tracf)] + trace_coordinates(iline_number, xline_number)
+        
+        
+        # The affine map only depends on the survey's corners: built on the first call
+        if self.survey_map is None:
+            df = self.basemap_dataframe
 
-            # vector diferences. Formula utm = b - a + c
-            tutmx = float(xline_df[xline_df["xline"] == xline_number]["utmx"]) - xline_df["utmx"].iloc[0] + float(iline_df[iline_df["iline"] == iline_number]["utmx"])
-            tutmy = float(xline_df[xline_df["xline"] == xline_number]["utmy"]) - xline_df["utmy"].iloc[0] + float(iline_df[iline_df["iline"] == iline_number]["utmy"])
+            # Line numbers and coordinates of the corners, and the limits of both directions
+            iline_arr, xline_arr = df["iline"].to_numpy(), df["xline"].to_numpy()
+            utm_arr = _xy_array(df)
+            limits = {"iline": (int(np.min(iline_arr)), int(np.max(iline_arr))), 
+                      "xline": (int(np.min(xline_arr)), int(np.max(xline_arr)))}
+
+            # Amount of CDP within crosslines
+            dif_xlines = limits["xline"][1] - limits["xline"][0] + 1
 
-            return [int(tracf), tutmx, tutmy]
+            self.survey_map = (limits, dif_xlines) + survey_affine_map(iline_arr, xline_arr, utm_arr, limits)
+        limits, dif_xlines, (utmx0, utmy0), (du_di, du_dx, dv_di, dv_dx) = self.survey_map
+        (imin, _), (xmin, _) = limits["iline"], limits["xline"]
         
+        # Extracting the intersection coordinates
+        intersection = seismic_intersection(iline_number, xline_number)
         
-        df = self.basemap_dataframe
-        # Assigning a variable for each dataframe in seismic_lines_dataframe
-        ilines, xlines = seismic_lines_dataframe(df.keys()[1], df.keys()[0]), seismic_lines_dataframe(df.keys()[0], df.keys()[1])
+        # Both ends of the chosen lines
+        (iline_utmx, iutmx), (iline_utmy, iutmy) = zip(*(trace_coordinates(iline_number, xline) 
+                                                         for xline in limits["xline"]))
+        (xline_utmx, xutmx), (xline_utmy, xutmy) = zip(*(trace_coordinates(iline, xline_number) 
+                                                         for iline in limits["iline"]))
         
-        # Extracting the intersection coordinates
-        intersection = seismic_intersection(ilines, xlines, iline_number, xline_number)
-        
-        # Computing the second point to plot the seismic lines (By using vector differences)
-        ## This can be refactored
-        iutmx = float(xlines["utmx"].iloc[-1] - xlines["utmx"].iloc[0] + ilines[ilines["iline"] == iline_number]["utmx"])
-        iutmy = float(xlines["utmy"].iloc[-1] - xlines["utmy"].iloc[0] + ilines[ilines["iline"] == iline_number]["utmy"])
-        xutmx = float(ilines["utmx"].iloc[-1] - ilines["utmx"].iloc[0] + xlines[xlines["xline"] == xline_number]["utmx"])
-        xutmy = float(ilines["utmy"].iloc[-1] - ilines["utmy"].iloc[0] + xlines[xlines["xline"] == xline_number]["utmy"])
-        
-        # hovers for lines and interception
-        iline_hover = HoverTool(tooltips=[("Inline", f"{iline_number}")] + self.hover_format)
-        xline_hover = HoverTool(tooltips=[("Crossline", f"{xline_number}")] + self.hover_format)
-        int_hover = HoverTool(tooltips=[("Intersection", f"({iline_number}/{xline_number})")] + self.hover_format)
-        
-        #Updating hover attributes
-        for item in [iline_hover, xline_hover, int_hover]:
-            item._property_values.update(self.hover_attributes)
-            
-        # Plotting the Inline. Holoviews Curve element
-        iline = hv.Curve([(float(ilines[ilines["iline"] == iline_number]["utmx"]), 
-                            float(ilines[ilines["iline"] == iline_number]["utmy"])),
-                           (iutmx, iutmy)], label = "I-Line")
 
-        # Plotting the Crossline. Holoviews Curve element
-        xline = hv.Curve([(float(xlines[xlines["xline"] == xline_number]["utmx"]), 
-                            float(xlines[xlines["xline"] == xline_number]["utmy"])),
-                           (xutmx, xutmy)], label = "C-Line")
+        # Plotting the Inline and the Crossline. A single Holoviews Path element (one Bokeh glyph)
+        lines = hv.Path([{"utmx": [iline_utmx, iutmx], "utmy": [iline_utmy, iutmy], 
+                          "kind": "Inline", "number": iline_number},
+                         {"utmx": [xline_utmx, xutmx], "utmy": [xline_utmy, xutmy], 
+                          "kind": "Crossline", "number": xline_number}],
+                        ["utmx", "utmy"], ["kind", "number"], label = "I-Line/C-Line")
         
          # Plot the intersection. Holovies Scatter element.
-        intersection = hv.Scatter((intersection[1], intersection[2]), label = "Intersection")
+        intersection = hv.Scatter(([intersection[1]], [intersection[2]], [iline_number], [xline_number]), 
+                                  "utmx", ["utmy", "iline", "xline"], label = "Intersection")
 
         # Adding the hover tool in to the plots
-        iline.opts(line_width = 2, color = "red", tools = self.plot_tools + [iline_hover])
-        xline.opts(line_width = 2, color = "blue", tools = self.plot_tools + [xline_hover])
-        intersection.opts(size = 7, line_color = "black", line_width = 2, color = "yellow", tools = self.plot_tools + [int_hover])
+        lines.opts(line_width = 2, color = "kind", cmap = {"Inline": "red", "Crossline": "blue"}, 
+                   tools = self.plot_tools + [self.line_hover], backend_opts = self.webgl)
+        intersection.opts(size = 7, line_color = "black", line_width = 2, color = "yellow", tools = self.plot_tools + [self.int_hover],
+                          backend_opts = self.webgl)
 
         # Making the overlay of the seismic plot to deploy
-        BasemapModule.seismic_lines = iline * xline * intersection
-        return BasemapModule.seismic_lines 
+        self.seismic_lines = lines * intersection
+        return self.seismic_lines 
  
     def get_basemap(self):
     
@@ -433,7 +544,7 @@ class BasemapModule:
             BasemapModule.basemap_dataframe : (Pandas)DataFrame
                 Matrix compounded by the coordinates and lines of the seismic survey's corners.
 
-            Survey.survey_name : str
+            BasemapModule.survey_name : str
                 Name of the seismic survey.
 
         RETURN
@@ -441,16 +552,16 @@ class BasemapModule:
             Panel Layout [Row]
                 Container of the following indexed elements:
                     [0] WidgetBox
-                    [0] Markdown for Survey.survey_name
+                    [0] Markdown for BasemapModule.survey_name
                     [1] IntSlider for inline number selection
                     [2] IntSlider for crossline number selection
                     [3] Select for well selection
-                    [1] basemap attribute
+                    [1] HoloViews pane of the basemap attribute
                      
         FUNCTIONS
         ---------
             basemap_plot(**kwargs)
-                Constructs the basemap attribute.
+                Updates the basemap attribute.
 
             update_plot(**kwargs)
                 Links Panel's selection widgets to the basemap attribute.
@@ -458,26 +569,52 @@ class BasemapModule:
         """
 
         df = self.basemap_dataframe
+
+        # Line limits, computed once for both sliders
+        iline_arr, xline_arr = df["iline"].to_numpy(), df["xline"].to_numpy()
+        il_min, il_max = int(iline_arr.min()), int(iline_arr.max())
+        xl_min, xl_max = int(xline_arr.min()), int(xline_arr.max())
         
         # Widgets
         iline_number = pn.widgets.IntSlider(name = "Inline number",
-                                            start = int(df["iline"].min()),
-                                            end = int(df["iline"].max()),
+                                            start = il_min,
+                                            end = il_max,
                                             step = self.iline_step,
-                                            value = int(df["iline"].min()))
+                                            value = il_min)
 
         xline_number = pn.widgets.IntSlider(name = "Crossline number",
-                                            start = int(df["xline"].min()),
-                                            end = int(df["xline"].max()),
+                                            start = xl_min,
+                                            end = xl_max,
                                             step = self.xline_step,
-                                            value = int(df["xline"].min()))
+                                            value = xl_min)
+
+        # Selector options and line numbers of each well (looked up by name when a well is selected),
+        # built on the first call
+        if self.well_options is None:
+            self.well_options = (["None"] + self.wells_dataframe["name"].tolist(),
+                                 self.wells_dataframe.set_index("name")[["cdp_iline", "cdp_xline"]]
+                                 .astype("int32").to_dict("index"))
+        well_names, wells_lines = self.well_options
 
         select_well = pn.widgets.Select(name = "Select the well to inspect", 
-                                        options = ["None"] + list(self.wells_dataframe["name"]),
+                                        options = well_names,
                                         value = "None")
 
-        @pn.depends(iline_number.param.value, xline_number.param.value, select_well.param.value)
-        def basemap_plot(iline_number, xline_number, select_well):
+        # Polygon and wells do not depend on the widgets: built once
+        self.polygon_plot()
+        self.wells_plot()
+
+        # Seismic lines are redrawn by sending line numbers through the pipe. Bokeh's plot is built
+        # once and only the data of the line and intersection glyphs is replaced: polygon and wells 
+        # are sent to the browser a single time
+        line_pipe = streams.Pipe(data = (iline_number.value, xline_number.value))
+        seismic_lines = hv.DynamicMap(lambda data: self.seismic_line_plot(*data), streams = [line_pipe])
+
+        # Final Overlay
+        self.basemap = self.polygon * self.wells * seismic_lines
+        self.basemap.opts(legend_position = 'top', height = 600, width = 600)
+
+        def basemap_plot(event):
             
             """
             NAME
@@ -486,48 +623,30 @@ class BasemapModule:
             
             DESCRIPTION
             -----------
-                Constructs the basemap attribute.
+                Updates the basemap attribute.
 
-                Merges seismic survey related plots using Holoviews and bokeh as backend.
+                Sends the chosen line numbers to the seismic_lines attribute, which redraws the 
+                seismic lines and their intersection.
                 
             ARGUMENTS
             ---------
-                Arguments are given by Panel's widgets through the panel's depend decorator:
-
-                iline_number : int
-                    Number of the chosen inline.
-
-                xline_number : int
-                    Number of the chosen crossline.
-                    
-                select_well : str
-                    Automatically gives well's line numbers when selected.
+                event : param Event
+                    Released value of either Panel's slider widget. Both line numbers are read 
+                    from the sliders.
 
             RETURN
             ------
-                basemap : Holviews element [Overlay] instance attribute
-                    Combination of the plots: polygon, wells and seismic_lines.
+                None
             
             """
             #new attributes
-            WiggleModule.inline_number = iline_number
-            WiggleModule.crossline_number = xline_number
-            
-            # First element
-            BasemapModule.polygon = BasemapModule.polygon_plot(self)
-            # Second element
-            BasemapModule.wells = BasemapModule.wells_plot(self)
-
-            # Third element
-            BasemapModule.seismic_lines = BasemapModule.seismic_line_plot(self, iline_number, xline_number)
-            
-            # Final Overlay
-            BasemapModule.basemap = BasemapModule.polygon * BasemapModule.wells * BasemapModule.seismic_lines
-            BasemapModule.basemap.opts(legend_position = 'top', height = 600, width = 600)
+            WiggleModule.inline_number = iline_number.value_throttled
+            WiggleModule.crossline_number = xline_number.value_throttled
 
-            return(BasemapModule.basemap)
+            # Polygon and wells are static; only the seismic lines change
+            line_pipe.send((iline_number.value_throttled, xline_number.value_throttled))
 
-        widgets = pn.WidgetBox(f"## {Survey.survey} Basemap", iline_number, xline_number, select_well)
+        widgets = pn.WidgetBox(f"## {self.survey_name} Basemap", iline_number, xline_number, select_well)
         
         def update_plot(event):
             
@@ -556,11 +675,24 @@ class BasemapModule:
             """
             
             if select_well.value != "None":
-                iline_number.value = int(self.wells_dataframe["cdp_iline"].loc[str(select_well.value)])
-                xline_number.value = int(self.wells_dataframe["cdp_xline"].loc[str(select_well.value)])
+                # Both sliders move silently (value_throttled included, as if released by the user)
+                # and the plot is updated once
+                well = wells_lines[select_well.value]
+                with param.discard_events(iline_number), param.discard_events(xline_number):
+                    for slider, column in ((iline_number, "cdp_iline"), (xline_number, "cdp_xline")):
+                        number = well[column]
+                        with param.edit_constant(slider):
+                            slider.param.update(value = number, value_throttled = number)
+                xline_number.param.trigger("value_throttled")
                 WiggleModule.inline_number = iline_number.value
                 WiggleModule.crossline_number = xline_number.value
 
+        # Sliders update the plot once released, not on every line crossed while dragging
+        iline_number.param.watch(basemap_plot, 'value_throttled')
+        xline_number.param.watch(basemap_plot, 'value_throttled')
         select_well.param.watch(update_plot, 'value')
+
+        # The pane keeps one object for the whole session; updates arrive through line_pipe
+        basemap_pane = pn.pane.HoloViews(self.basemap, sizing_mode = "fixed", width = 600, height = 600)
         
-        return pn.Row(widgets, basemap_plot).servable()
+        return pn.Row(widgets, basemap_pane).servable()
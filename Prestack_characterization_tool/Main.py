@@ -2,15 +2,28 @@
 # file management
 import os
 from shutil import copyfile
+from functools import cached_property
 
 # Calc
 import numpy as np
 import pandas as pd
+# Multithreaded CSV parsing and Parquet copy of the merge (optional)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
 from scipy.interpolate import interp1d
 from scipy import stats
+from numba import njit
 
 # SEG-Y file management
 import segyio
+# Single pass reads of trace headers (optional)
+try:
+    import segfast
+except ImportError:
+    segfast = None
 
 # Visualization
 import holoviews as hv
@@ -20,7 +33,8 @@ from holoviews import streams
 import panel as pn 
 
 # parallel execution of processes
-from multiprocessing import Pool
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_all_start_methods, get_context
 
 # Visualization platform
 hv.extension('bokeh')
@@ -32,6 +46,288 @@ from AVO import AVOModule
 
 # Code
 
+# Valid extensions of the input files
+_SEGY_EXTENSIONS = {".sgy", ".segy"}
+_WELLS_EXTENSIONS = {".txt"}
+
+def _existing_files(paths):
+    
+    """
+    NAME
+    ----
+        _existing_files
+        
+    DESCRIPTION
+    -----------
+        Finds which of the given paths are existing files. Each directory is listed once, instead
+        of querying the file system for every path.
+        
+    ARGUMENTS
+    ---------
+        paths : list
+            Paths of the files.
+            
+    RETURN
+    ------
+        set
+            Normalized paths of the existing files.
+            
+    """
+    
+    existing = set()
+    for directory in {os.path.dirname(os.path.normpath(path)) for path in paths}:
+        try:
+            with os.scandir(directory or os.curdir) as entries:
+                existing.update(os.path.join(directory, entry.name) for entry in entries if entry.is_file())
+        except OSError:
+            continue
+    return existing
+
+@njit(cache = True, nogil = True)
+def _apply_scalar(utmx, utmy, scalar):
+    
+    """
+    NAME
+    ----
+        _apply_scalar
+        
+    DESCRIPTION
+    -----------
+        Adapts coordinates to the SEG-Y's scalar value in a single pass, in place: positive 
+        scalars multiply, negative ones divide and zero leaves the coordinates as they are.
+        
+    ARGUMENTS
+    ---------
+        utmx : (Numpy)array
+            Horizontal coordinates, float64. Overwritten by the scaled ones.
+
+        utmy : (Numpy)array
+            Vertical coordinates, float64. Overwritten by the scaled ones.
+
+        scalar : (Numpy)array
+            SEG-Y coordinate scalar of each pair of coordinates.
+            
+    """
+    
+    for i in range(utmx.size):
+        factor = scalar[i]
+        if factor > 0:
+            utmx[i] *= factor
+            utmy[i] *= factor
+        elif factor < 0:
+            utmx[i] /= -factor
+            utmy[i] /= -factor
+
+@njit(cache = True, nogil = True)
+def _inside_lines(iline, xline, ilines, xlines):
+    
+    """
+    NAME
+    ----
+        _inside_lines
+        
+    DESCRIPTION
+    -----------
+        Finds which traces lie within the survey's line ranges. The four comparisons of each trace
+        are done in a single pass, without temporary arrays.
+        
+    ARGUMENTS
+    ---------
+        iline : (Numpy)array
+            Inline number of each trace.
+
+        xline : (Numpy)array
+            Crossline number of each trace.
+
+        ilines : (Numpy)array
+            Inline numbers of the survey.
+
+        xlines : (Numpy)array
+            Crossline numbers of the survey.
+            
+    RETURN
+    ------
+        mask : (Numpy)array
+            True for the traces inside the survey.
+            
+    """
+    
+    imin, imax, xmin, xmax = ilines.min(), ilines.max(), xlines.min(), xlines.max()
+    mask = np.empty(iline.size, dtype = np.bool_)
+    for i in range(iline.size):
+        mask[i] = imin <= iline[i] <= imax and xmin <= xline[i] <= xmax
+    return mask
+
+@njit(cache = True, nogil = True)
+def _interleave(merge_traces, stack_traces, file_index, n_offsets):
+    
+    """
+    NAME
+    ----
+        _interleave
+        
+    DESCRIPTION
+    -----------
+        Copies the samples of one PAS into the merge, as raw bytes, in a single pass. The traces 
+        of the PAS are every n_offsets traces of the merge, starting at file_index. Both files 
+        must share the sample format.
+        
+    ARGUMENTS
+    ---------
+        merge_traces : (Numpy)array
+            Bytes of the merge's traces (240 bytes of header, then the samples), one row per trace.
+
+        stack_traces : (Numpy)array
+            Bytes of the PAS's traces, one row per trace.
+
+        file_index : int
+            Index of the PAS's angle within the merge's offsets.
+
+        n_offsets : int
+            Amount of offsets (PAS) of the merge.
+            
+    """
+    
+    for trace in range(stack_traces.shape[0]):
+        merge_traces[trace * n_offsets + file_index, 240:] = stack_traces[trace, 240:]
+
+def _copy_offset(merge_path, gather_path, file_index, n_offsets):
+    
+    """
+    NAME
+    ----
+        _copy_offset
+        
+    DESCRIPTION
+    -----------
+        Copies the amplitudes of one PAS into the merge, converting them to the merge's sample 
+        format. The traces of the PAS are every n_offsets traces of the merge, starting at 
+        file_index. Used by merge for the PAS whose sample format differs from the merge's one. 
+        Traces are copied in blocks to bound the memory used.
+        
+    ARGUMENTS
+    ---------
+        merge_path : str
+            Path where the merge of the PAS is stored. Its headers must already be written.
+
+        gather_path : str
+            Path of the PAS.
+
+        file_index : int
+            Index of the PAS's angle within the merge's offsets.
+
+        n_offsets : int
+            Amount of offsets (PAS) of the merge.
+            
+    RETURN
+    ------
+        int
+            Amount of traces copied.
+            
+    """
+    
+    with segyio.open(merge_path, "r+", ignore_geometry = True) as s, segyio.open(gather_path, "r") as stack:
+        s.mmap()
+        stack.mmap()
+        for start in range(0, stack.tracecount, 4096):
+            block = stack.trace.raw[start:start + 4096]
+            s.trace[start * n_offsets + file_index:(start + len(block)) * n_offsets:n_offsets] = block
+        return stack.tracecount
+
+def _header_columns(path, fields):
+    
+    """
+    NAME
+    ----
+        _header_columns
+        
+    DESCRIPTION
+    -----------
+        Reads trace header fields of every trace of a SEG-Y file. With segfast installed all the 
+        fields are read in a single pass over a memory map of the file; otherwise SegyIO reads
+        each field as a column.
+        
+    ARGUMENTS
+    ---------
+        path : str
+            Path of the SEG-Y file.
+
+        fields : list
+            Byte of each trace header field.
+            
+    RETURN
+    ------
+        list
+            (Numpy)array of each field, in the order of fields.
+            
+    """
+    
+    fields = list(fields)
+    if segfast is not None:
+        headers = segfast.open(path, engine = "memmap").load_headers(fields, reconstruct_tsf = False, 
+                                                                     sort_columns = False)
+        return [headers.iloc[:, column].to_numpy() for column in range(len(fields))]
+    
+    with segyio.open(path, "r", ignore_geometry = True) as segy:
+        segy.mmap()
+        return [segy.attributes(byte)[:] for byte in fields]
+
+def _merge_to_parquet(merge_path, parquet_path, batch = 8192):
+    
+    """
+    NAME
+    ----
+        _merge_to_parquet
+        
+    DESCRIPTION
+    -----------
+        Stores a copy of the merge as a Parquet file: one row per trace, with its lines, offset,
+        coordinates and amplitudes. Every batch of traces is a row group, whose minimum and 
+        maximum of each column let readers skip the row groups out of a query (e.g. an inline 
+        range or a bounding box). Traces keep the order of the merge, so inline ranges are read 
+        from contiguous row groups. Line numbers and coordinates are delta encoded.
+        
+    ARGUMENTS
+    ---------
+        merge_path : str
+            Path where the merge of the PAS is stored.
+
+        parquet_path : str
+            Path where the Parquet copy will be stored.
+
+        batch : int
+            Amount of traces of each row group. 8192 by default.
+            
+    RETURN
+    ------
+        int
+            Amount of traces stored.
+            
+    """
+    
+    # Header fields stored [byte]
+    fields = {"iline": segyio.TraceField.INLINE_3D, "xline": segyio.TraceField.CROSSLINE_3D,
+              "offset": segyio.TraceField.offset, "cdp_x": segyio.TraceField.CDP_X, 
+              "cdp_y": segyio.TraceField.CDP_Y, "scalar": segyio.TraceField.SourceGroupScalar}
+    
+    with segyio.open(merge_path, "r", ignore_geometry = True) as segy:
+        segy.mmap()
+        n_samples = len(segy.samples)
+        schema = pa.schema([(name, pa.int32()) for name in fields] + 
+                           [("amplitude", pa.list_(pa.float32(), n_samples))])
+        delta = ["iline", "xline", "cdp_x", "cdp_y"]
+        
+        with pq.ParquetWriter(parquet_path, schema, compression = "zstd",
+                              use_dictionary = ["offset", "scalar"],
+                              column_encoding = dict.fromkeys(delta, "DELTA_BINARY_PACKED")) as writer:
+            for start in range(0, segy.tracecount, batch):
+                stop = min(start + batch, segy.tracecount)
+                columns = [pa.array(segy.attributes(byte)[start:stop], pa.int32()) for byte in fields.values()]
+                amplitude = segy.trace.raw[start:stop]
+                columns.append(pa.FixedSizeListArray.from_arrays(pa.array(amplitude.ravel()), n_samples))
+                writer.write_table(pa.Table.from_arrays(columns, schema = schema))
+        return segy.tracecount
+
 class Survey:
     
     """
@@ -44,8 +340,8 @@ class Survey:
     Main class of the Prestack Characterization Tool.
 
     Works as the container of the main objects and its data: Basemap, Wiggle and AVO. The
-    data is stored as class attributes to improve its scope of use and to avoid inheritance 
-    between objects.
+    data is stored as instance attributes, so several surveys can be worked at once, and each
+    object receives the survey it belongs to instead of inheriting from it.
 
     ATTRIBUTES
     ----------
@@ -62,6 +358,10 @@ class Survey:
         merge_path : str
             Path where the merge of the PAS will be stored.
 
+        merge_parquet_path : str
+            Path where a Parquet copy of the merge will be stored, one row per trace. None by 
+            default (no copy). Requires PyArrow.
+
         gradient_path : str
             Path where the computation of the "Gradient" will be stored.
 
@@ -71,19 +371,17 @@ class Survey:
         rvalue_path : str
             Path where the computation of the "Correlation Coefficient" will be stored.
 
-        pvalue_path : str
-            Path where the computation of the "P Value" will be stored.
-
         stderr_path : str
-            Path where the computation of the "Standard Error" will be stored.
+            Path where the computation of the "Standard Error" will be stored. P-value is derived 
+            from the stored attributes when they are organized.
 
         angle_interval : int
             Interval between PAS.
 
-        angle_list : list
-            List of the average angle of each PAS. None by default. If the value it's different
-            from None, a constructor will create the list by using angle_interval and the 
-            amount of files in gathers_path.
+        angle_list : (Numpy)array
+            Average angle of each PAS. None by default. If the value it's different from None, 
+            a constructor will create the array by using angle_interval and the amount of files 
+            in gathers_path.
 
         cube_validation : bool
             Whether the seismic files are suitable to work with. False by default.
@@ -98,6 +396,11 @@ class Survey:
         wells_dataframe : (Pandas)DataFrame
             Matrix compounded by wells related information. Empty by default.
 
+        coord_dtype : str
+            Data type of the UTM coordinates within basemap_dataframe and wells_dataframe. 
+            "float64" by default; "float32" halves their size but rounds northings of millions of
+            meters to about one meter. Must be set before organizing the data.
+
         inlines : list
             List of inlines (numbers) within the survey. Empty by default.
 
@@ -129,6 +432,9 @@ class Survey:
         wells_data_organization(**kwargs)
             Creates well's information matrix. 
 
+        close()
+            Shuts down the worker processes of the survey's parallel jobs.
+
     LIBRARIES
     ---------
         Numpy: BSD licensed package for scientific computing with Python. More information
@@ -144,49 +450,62 @@ class Survey:
                 2014. Code Available at:
                     https://github.com/equinor/segyio.
 
+        Segfast: Apache licensed library for fast loading of SEG-Y files. Optional, used to read 
+                 trace headers. More information available at:
+                     https://github.com/analysiscenter/segfast
+
+        PyArrow: Apache licensed Python library for Apache Arrow. Optional, used to parse the wells
+                 files and to store the Parquet copy of the merge. More information available at:
+                     https://arrow.apache.org/docs/python/
+
     """ 
 
+    # Data type of the UTM coordinates
+    coord_dtype = "float64"
+
     def __init__(self, survey_name, 
                  gathers_path, wells_path, merge_path, 
-                 gradient_path, intercept_path, rvalue_path, pvalue_path, stderr_path,
-                 angle_interval, angle_list = None):
+                 gradient_path, intercept_path, rvalue_path, stderr_path,
+                 angle_interval, angle_list = None, merge_parquet_path = None):
         
         """
         DESCRIPTION
         -----------
-            Instantiates Survey's class attributes. For more information, please refer to Survey's 
+            Instantiates Survey's attributes. For more information, please refer to Survey's 
             docstring.
             
         """
         
         # Name of the survey
-        Survey.survey = survey_name
+        self.survey = survey_name
         # Files
-        Survey.gathers_path = gathers_path
-        Survey.wells_path = wells_path
-        Survey.merge_path = merge_path
+        self.gathers_path = gathers_path
+        self.wells_path = wells_path
+        self.merge_path = merge_path
+        self.merge_parquet_path = merge_parquet_path
         # AVO files
-        Survey.gradient_path = gradient_path
-        Survey.intercept_path = intercept_path
-        Survey.rvalue_path = rvalue_path
-        Survey.pvalue_path = pvalue_path
-        Survey.stderr_path = stderr_path
+        self.gradient_path = gradient_path
+        self.intercept_path = intercept_path
+        self.rvalue_path = rvalue_path
+        self.stderr_path = stderr_path
         # Partial angle stacks angles
-        Survey.angle_interval = angle_interval
-        if angle_list == None:
-            Survey.angle_list = [i*Survey.angle_interval for i in range(1, len(Survey.gathers_path)+1)]
+        self.angle_interval = angle_interval
+        if angle_list is None:
+            self.angle_list = np.arange(1, len(self.gathers_path)+1, dtype = "int32") * self.angle_interval
         else: 
-            Survey.angle_list = angle_list  
-        Survey.cube_validation = False
-        Survey.wells_validation = False
+            self.angle_list = np.asarray(angle_list)
+        self.cube_validation = False
+        self.wells_validation = False
         # Empty attributes to initialize empty objects
-        Survey.basemap_dataframe = pd.DataFrame([])
-        Survey.wells_dataframe = pd.DataFrame([])
-        Survey.inlines = []
-        Survey.crosslines = []
+        self.basemap_dataframe = pd.DataFrame([])
+        self.wells_dataframe = pd.DataFrame([])
+        self.inlines = []
+        self.crosslines = []
+        # Worker processes, started by the first parallel job
+        self._executor = None
             
-    # Setters for each object
-    @property
+    # Setters for each object, built on first access and rebuilt after the data is organized
+    @cached_property
     def BasemapModule(self):
         
         """
@@ -196,14 +515,14 @@ class Survey:
         
         DESCRIPTION
         -----------
-            Dynamically instantiates the Basemap object. For more information, please refer to
-            BasemapModule class.
+            Instantiates the Basemap object on its first access. For more information, please 
+            refer to BasemapModule class.
         
         """
         
-        return BasemapModule(self.basemap_dataframe, self.wells_dataframe)
+        return BasemapModule(self.basemap_dataframe, self.wells_dataframe, self.survey)
     
-    @property
+    @cached_property
     def WiggleModule(self):
         
         """
@@ -213,13 +532,13 @@ class Survey:
         
         DESCRIPTION
         -----------
-            Dynamically instantiates the Wiggle object. For more information, please refer to 
-            WiggleModule class.
+            Instantiates the Wiggle object on its first access. For more information, please 
+            refer to WiggleModule class.
         
         """
-        return WiggleModule(self.inlines, self.crosslines)
+        return WiggleModule(self.inlines, self.crosslines, self)
     
-    @property
+    @cached_property
     def AVOModule(self):
         
         """
@@ -229,34 +548,110 @@ class Survey:
         
         DESCRIPTION
         -----------
-            Dynamically instantiates the AVO object. For more information, please refer to
-            AVOModule class.
+            Instantiates the AVO object on its first access. For more information, please 
+            refer to AVOModule class.
+            
+        """
+        
+        return AVOModule(self.inlines, self.crosslines, self)
+
+    def _pool(self, initializer = None, initargs = ()):
+        
+        """
+        NAME
+        ----
+            _pool
+        
+        DESCRIPTION
+        -----------
+            Returns the survey's pool of worker processes, one per core. The pool is started by 
+            the first call and reused by the following ones, so each parallel job does not pay 
+            the start of its workers. The workers are bound to the survey's files: its data must
+            be ready before the first call.
+
+            Workers are started by a fork server (spawned where it is unavailable), never forked
+            from this process: the threads it runs (numba's, the gathers' and the prefetch ones)
+            do not survive a fork and would leave the workers deadlocked. Workers import the 
+            modules and run initializer instead of inheriting this process' state.
+            
+        ARGUMENTS
+        ---------
+            initializer : function
+                Run once in each worker when the pool is started. None by default.
+
+            initargs : tuple
+                Arguments of initializer.
+
+        RETURN
+        ------
+            ProcessPoolExecutor
+                Pool of worker processes.
             
         """
         
-        return AVOModule(self.inlines, self.crosslines)
+        if self._executor is None:
+            method = "forkserver" if "forkserver" in get_all_start_methods() else "spawn"
+            self._executor = ProcessPoolExecutor(max_workers = os.cpu_count(), mp_context = get_context(method),
+                                                 initializer = initializer, initargs = initargs)
+        return self._executor
+
+    def close(self):
+        
+        """
+        NAME
+        ----
+            close
+        
+        DESCRIPTION
+        -----------
+            Shuts down the survey's worker processes, if started, and closes the SEG-Y files kept
+            open by this process (AVO's handles and the merge of the gathers display). The next 
+            parallel job starts new workers and the files are opened again when needed.
+            
+        """
+        
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+        AVOModule.close_files()
+        if "WiggleModule" in self.__dict__:
+            self.WiggleModule.clear_cache()
+
+    def _reset_modules(self):
+        
+        """
+        NAME
+        ----
+            _reset_modules
+        
+        DESCRIPTION
+        -----------
+            Discards the Basemap, Wiggle and AVO objects built so far, so their next access builds
+            them from the current data.
+            
+        """
+        
+        for module in ["BasemapModule", "WiggleModule", "AVOModule"]:
+            self.__dict__.pop(module, None)
       
     def __repr__(self):
-        print(f"PAS given:")
-        for file in self.gathers_path:
-            print(f"        - {file}")
-        print(f"These files will be merged following the name&path: {self.merge_path}")
-        print(f"Wells given: ")
-        for well in self.wells_path:
-            print(f"        - {well}")
-        print(f"Interval between the angle gathers = {self.angle_interval}")
-        print(f"Angle list based on the angle interval and que amount of files given = {self.angle_list}")
-        print(f"Brand new SEG-Y files name&path: ")
-        for file in [self.gradient_path, self.intercept_path, self.rvalue_path, self.pvalue_path, self.stderr_path]:
-            print(f"        - {file}")
-        print(f"inlines: {self.inlines}")
-        print(f"crosslines: {self.crosslines}")
-        print(f"Basemap dataframe: {self.basemap_dataframe}")
-        print(f"Wells dataframe: {self.wells_dataframe}")
-        print(f"Basemap object: {self.BasemapModule}")
-        print(f"Wiggle object: {self.WiggleModule}")
-        print(f"AVO object: {self.AVOModule}")       
-        return(f"Previous parameters have been stored successfully")
+        lines = ["PAS given:"]
+        lines += [f"        - {file}" for file in self.gathers_path]
+        lines.append(f"These files will be merged following the name&path: {self.merge_path}")
+        lines.append("Wells given: ")
+        lines += [f"        - {well}" for well in self.wells_path]
+        lines.append(f"Interval between the angle gathers = {self.angle_interval}")
+        lines.append(f"Angle list based on the angle interval and que amount of files given = {self.angle_list}")
+        lines.append("Brand new SEG-Y files name&path: ")
+        lines += [f"        - {file}" for file in [self.gradient_path, self.intercept_path, self.rvalue_path, 
+                                                           self.stderr_path]]
+        lines.append(f"inlines: {self.inlines}")
+        lines.append(f"crosslines: {self.crosslines}")
+        # Only the first rows of each dataframe
+        lines.append(f"Basemap dataframe: {self.basemap_dataframe.head()!r}")
+        lines.append(f"Wells dataframe: {self.wells_dataframe.head()!r}")
+        return "\n".join(lines)
    
     def validation(self):
             
@@ -287,17 +682,17 @@ class Survey:
 
         RETURN
         ------
-            Survey.cube_validation : bool class attribute
+            Survey.cube_validation : bool instance attribute
                 True if the files finish the validation process. False if the file is not suitable for
                 execution.
 
 
-            Survey.wells_validation : bool class attribute
+            Survey.wells_validation : bool instance attribute
                 True if the files finish the validation process. False if the file is not suitable for
                 execution.
             
             str
-                Short description of why the file is not appropriate for work.
+                Short description of why each file is not appropriate for work, one per line.
 
         ON PROGRESS
         -----------
@@ -312,42 +707,44 @@ class Survey:
             https://seg.org/Portals/0/SEG/News%20and%20Resources/Technical%20Standards/seg_y_rev2_0-mar2017.pdf
         """
         
+        # Every problem found is reported, not only the first one
+        errors = []
+
         #Cube validation
+        existing = _existing_files(self.gathers_path)
+        self.cube_validation = True
         for file in self.gathers_path:
+            root, ext = os.path.splitext(file)
 
             # First validation: does the file exist?
-            if os.path.isfile(file):
-                file, ext = os.path.splitext(file)
-
-                # Second validation: does the file has a .sgy or .segy extension?
-                if ext.lower() == (".sgy") or ext.lower() == (".segy"):
-                    print(f"Cube file: '{file}' has been validated")
-                    self.cube_validation = True
+            if os.path.normpath(file) not in existing:
+                self.cube_validation = False
+                errors.append(f"Cube file: '{file}' does not exist.")
 
-                # If not, return text: not a valid one
-                else:
-                    self.cube_validation = False
-                    return(f"Cube file: '{file}' extension in not valid.")
+            # Second validation: does the file has a .sgy or .segy extension?
+            elif ext.lower() not in _SEGY_EXTENSIONS:
+                self.cube_validation = False
+                errors.append(f"Cube file: '{root}' extension in not valid.")
 
-            # If not, return text: file does not exist
             else:
-                self.cube_validation = False
-                return(f"Cube file: '{file}' does not exist.")
-            
+                print(f"Cube file: '{root}' has been validated")
             
         #Wells validation
+        existing = _existing_files(self.wells_path)
+        self.wells_validation = True
         for doc in self.wells_path:
-            if os.path.isfile(doc):
-                file, ext = os.path.splitext(doc)
-                if ext.lower() == (".txt"):
-                    print(f"Wells file: '{doc}' has been validated")
-                    self.wells_validation = True
-                else:
-                    self.wells_validation = False
-                    return(f"Wells file '{doc}' extension in not valid.")
-            else:
+            if os.path.normpath(doc) not in existing:
                 self.wells_validation = False
-                return(f"Wells file '{doc}' does not exist.")
+                errors.append(f"Wells file '{doc}' does not exist.")
+            elif os.path.splitext(doc)[1].lower() not in _WELLS_EXTENSIONS:
+                self.wells_validation = False
+                errors.append(f"Wells file '{doc}' extension in not valid.")
+            else:
+                print(f"Wells file: '{doc}' has been validated")
+
+        # If not, return text: why the files are not valid ones
+        if errors:
+            return("\n".join(errors))
        
     def merge(self):
         
@@ -377,8 +774,11 @@ class Survey:
             Survey.merge_path : str
                 Path where the merge of the PAS will be stored.
 
-            Survey.angle_list : list
-                List of the average angle of each PAS.
+            Survey.angle_list : (Numpy)array
+                Average angle of each PAS.
+
+            Survey.merge_parquet_path : str
+                Path where the Parquet copy of the merge will be stored, if any.
                 
         RETURN
         ------    
@@ -397,13 +797,19 @@ class Survey:
         """
         Survey.validation(self)
         if self.cube_validation == True:
-       
+            if self.merge_parquet_path is not None and pq is None:
+                raise ImportError("PyArrow is required to store the merge as Parquet")
+
+            # Workers and this process hold the previous merge open
+            self.close()
 
             # Making the offset array
-            offsts = np.array(self.angle_list)
+            offsts = self.angle_list
 
-            # Initializing the stacks
+            # Initializing the stacks. The file of each angle follows the order of angle_list
             with segyio.open(self.gathers_path[0]) as f:
+                # Memory mapped reads; segyio falls back to regular I/O when mapping fails
+                f.mmap()
 
                 # Spec function to build the new segy
                 spec = segyio.spec()
@@ -417,40 +823,58 @@ class Survey:
                 # Initializing the merged one
                 with segyio.create(self.merge_path, spec) as s:
 
-                    # Index for the merge headers and trace
-                    merge_index = 0
-                    # Index for the original file's headers and trace
-                    stack_index = 0
-                    # For loop to set parameters according to the seismic lines and offset
-                    for il in spec.ilines:
-                        for xl in spec.xlines:
-                            for offset in spec.offsets:
-                                # Assigning headers [byte]
-                                s.header[merge_index] = {segyio.su.tracl: f.header[stack_index][1],
-                                                         segyio.su.tracr: f.header[stack_index][5],
-                                                         segyio.su.fldr: f.header[stack_index][9],
-                                                         segyio.su.cdp: f.header[stack_index][21],
-                                                         segyio.su.cdpt: f.header[stack_index][25],
-                                                         segyio.su.offset: offset,  # 37
-                                                         segyio.su.scalco: f.header[stack_index][71],
-                                                         segyio.su.ns: f.header[stack_index][115],
-                                                         segyio.su.dt: f.header[stack_index][117],
-                                                         segyio.su.cdpx: f.header[stack_index][181],
-                                                         segyio.su.cdpy: f.header[stack_index][185],
-                                                         segyio.su.iline: il,  # 189
-                                                         segyio.su.xline: xl}  # 193
-
-                                # Extracts the index of the angle which match with the file's index
-                                file_index = self.angle_list.index(offset)
-
-                                # Openning the file asociated with the angle in offset
-                                with segyio.open(self.gathers_path[file_index], "r") as stack:
-
-                                    # Copying the amplitudes from each stack
-                                    s.trace[merge_index] = stack.trace[stack_index]
-
-                                merge_index += 1
-                            stack_index += 1
+                    # The merge holds one trace per angle for each trace of the stacks: the traces of 
+                    # one angle are every len(offsets) traces of the merge
+                    n_offsets = len(spec.offsets)
+
+                    # Header fields copied from the first stack [byte], each read once as a column
+                    fields = {segyio.su.tracl: 1, segyio.su.tracr: 5, segyio.su.fldr: 9, segyio.su.cdp: 21,
+                              segyio.su.cdpt: 25, segyio.su.scalco: 71, segyio.su.ns: 115, segyio.su.dt: 117,
+                              segyio.su.cdpx: 181, segyio.su.cdpy: 185}
+                    columns = np.column_stack(_header_columns(self.gathers_path[0], fields.values())).tolist()
+
+                    # Assigning headers: offset (37), iline (189) and xline (193) are set for each
+                    # trace of the merge, following the seismic lines and offset
+                    keys = list(fields) + [segyio.su.offset, segyio.su.iline, segyio.su.xline]
+                    lines = ((il, xl) for il in spec.ilines for xl in spec.xlines)
+                    s.header = (dict(zip(keys, values + [offset, il, xl])) 
+                                for values, (il, xl) in zip(columns, lines) 
+                                for offset in spec.offsets)
+
+                    # Size of the complete merge: textual and binary headers, then every trace
+                    tracecount = f.tracecount
+                    trace_bytes = 240 + 4 * len(spec.samples)
+                    merge_size = 3600 + tracecount * n_offsets * trace_bytes
+
+            # Allocating the traces' amplitudes (zeros until copied) so the merge can be reopened
+            os.truncate(self.merge_path, merge_size)
+
+            # Copying the amplitudes of each stack. Stacks in the merge's sample format (4-byte IBM
+            # float) are copied as raw bytes between memory maps; the others are converted by SegyIO
+            merge_traces = np.memmap(self.merge_path, dtype = "uint8", mode = "r+", offset = 3600,
+                                     shape = (tracecount * n_offsets, trace_bytes))
+            converted = []
+            for file_index, path in enumerate(self.gathers_path):
+                with segyio.open(path, "r", ignore_geometry = True) as stack:
+                    sample_format = stack.bin[segyio.BinField.Format]
+                    offset = 3600 + 3200 * stack.ext_headers
+                if sample_format == spec.format:
+                    stack_traces = np.memmap(path, dtype = "uint8", mode = "r", offset = offset,
+                                             shape = (tracecount, trace_bytes))
+                    _interleave(np.asarray(merge_traces), np.asarray(stack_traces), file_index, n_offsets)
+                    del stack_traces
+                else:
+                    converted.append(file_index)
+            merge_traces.flush()
+            del merge_traces
+
+            for file_index in converted:
+                _copy_offset(self.merge_path, self.gathers_path[file_index], file_index, n_offsets)
+
+            # Parquet copy of the merge, for readers that only need part of the survey
+            if self.merge_parquet_path is not None:
+                _merge_to_parquet(self.merge_path, self.merge_parquet_path)
+                print(f"Parquet copy of the merge: {self.merge_parquet_path}")
 
             return (f"Successful merge. New SEG-Y file path: {self.merge_path}")
         
@@ -481,10 +905,10 @@ class Survey:
         
         RETURN
         ------
-            Survey.inlines : list class attribute
+            Survey.inlines : list instance attribute
                 Inlines within the survey.
 
-            Survey.crosslines : list class attribute
+            Survey.crosslines : list instance attribute
                 Crosslines within the survey.
 
             WiggleModule.sample_interval : int instance attribute
@@ -496,13 +920,15 @@ class Survey:
             WiggleModule.trace_length : list instance attribute
                 Range of trace's time axis.
                 
-            Survey.basemap_dataframe : (Pandas)DataFrame class attribute
+            Survey.basemap_dataframe : (Pandas)DataFrame instance attribute
                 A matrix compounded by the coordinates of the seismic survey's corners. The information
                 is structured by the following columns:
                     - iline: inline number of the line where the corner is located.
                     - xline: crossline number of the line where the corner is located.
                     - utmx: horizontal coordinates Universal Transversal Mercator coordinate system.
                     - utmy: vertical coordinates Universal Transversal Mercator coordinate system.
+                Line numbers are int32 and coordinates float64. Each column is stored contiguously, 
+                so numeric code reads it through to_numpy() without copies.
                             
         ON PROGRESS
         -----------
@@ -518,6 +944,8 @@ class Survey:
         if self.cube_validation == True:
             if self.basemap_dataframe.empty:
                 with segyio.open(self.merge_path, "r") as segy:
+                    # Memory mapped reads; segyio falls back to regular I/O when mapping fails
+                    segy.mmap()
 
                     #Accessing & storing line numbers
                     self.inlines = segy.ilines
@@ -529,42 +957,29 @@ class Survey:
                     WiggleModule.trace_length = [0, 
                                                  WiggleModule.sample_interval * WiggleModule.samples_per_trace - WiggleModule.sample_interval]
 
-                    # Array to extract the min/max coordinates
-                    utmx = segy.attributes(segyio.TraceField.CDP_X)[:] 
-                    utmy = segy.attributes(segyio.TraceField.CDP_Y)[:] 
+                    # Header columns; coordinates to extract the min/max ones
+                    iline, xline, utmx, utmy, scalar = _header_columns(self.merge_path, 
+                                                                       [segyio.TraceField.INLINE_3D, 
+                                                                        segyio.TraceField.CROSSLINE_3D,
+                                                                        segyio.TraceField.CDP_X, 
+                                                                        segyio.TraceField.CDP_Y,
+                                                                        segyio.TraceField.SourceGroupScalar])
 
-                    # Extracting the points
+                    # Extracting the points. The first one is repeated to close the survey's polygon
                     corners = [utmx.argmin(), utmy.argmin(), utmx.argmax(), utmy.argmax()]
-
-                    # Making a Dataframe from the coordinates in corners
-                    for index in corners:
-                        series = {"iline": segy.attributes(segyio.TraceField.INLINE_3D)[index], 
-                                        "xline": segy.attributes(segyio.TraceField.CROSSLINE_3D)[index],
-                                        "utmx": segy.attributes(segyio.TraceField.CDP_X)[index], 
-                                        "utmy": segy.attributes(segyio.TraceField.CDP_Y)[index],
-                                        "scalar" : segy.attributes(segyio.TraceField.SourceGroupScalar)[index]}
-                        self.basemap_dataframe = pd.concat([self.basemap_dataframe, 
-                                                            pd.DataFrame(series)], ignore_index = True, axis="rows")
-
-                    # Adapting the coordinates to the segy's scalar value
-                    self.basemap_dataframe['utmx'] = np.where(self.basemap_dataframe['scalar'] == 0, 
-                                                              self.basemap_dataframe['utmx'],
-                                                    np.where(self.basemap_dataframe['scalar'] > 0,
-                                                             self.basemap_dataframe['utmx'] * self.basemap_dataframe['scalar'],
-                                                             self.basemap_dataframe['utmx'] / abs(self.basemap_dataframe['scalar'])))
-
-                    self.basemap_dataframe['utmy'] = np.where(self.basemap_dataframe['scalar'] == 0,
-                                                              self.basemap_dataframe['utmy'],
-                                                    np.where(self.basemap_dataframe['scalar'] > 0, 
-                                                             self.basemap_dataframe['utmy'] * self.basemap_dataframe['scalar'],
-                                                             self.basemap_dataframe['utmy'] / abs(self.basemap_dataframe['scalar'])))
-
-                    # Dropping the scalar column
-                    self.basemap_dataframe = self.basemap_dataframe.drop(["scalar"], axis = 1)
-
-                    # Concatenating the first row once again to close the survey's polygon
-                    first_row = pd.DataFrame(self.basemap_dataframe.iloc[0]).transpose()
-                    self.basemap_dataframe = pd.concat([self.basemap_dataframe, first_row], ignore_index = True, axis = 0)
+                    corners.append(corners[0])
+
+                    # Coordinates in corners, adapted to the segy's scalar value in place
+                    corner_x, corner_y = utmx[corners].astype("float64"), utmy[corners].astype("float64")
+                    _apply_scalar(corner_x, corner_y, scalar[corners])
+
+                    # Making a Dataframe from the corners. Line numbers as integers; UTM coordinates
+                    # as coord_dtype
+                    self.basemap_dataframe = pd.DataFrame({"iline": iline[corners].astype("int32"),
+                                                           "xline": xline[corners].astype("int32"),
+                                                           "utmx": corner_x.astype(self.coord_dtype, copy = False),
+                                                           "utmy": corner_y.astype(self.coord_dtype, copy = False)})
+                    self._reset_modules()
                 
                 return self.basemap_dataframe
             
@@ -604,7 +1019,7 @@ class Survey:
         
         RETURN
         ------
-            Survey.wells_dataframe : (Pandas)DataFrame class attribute
+            Survey.wells_dataframe : (Pandas)DataFrame instance attribute
                 A matrix compounded by the information related to each well inside the survey. 
                 The information is structured by the following columns:
                     - name: well's name
@@ -618,19 +1033,26 @@ class Survey:
         
         if self.wells_validation == True:
 
+            # Line numbers as integers; UTM coordinates as coord_dtype. Parsed straight into these 
+            # types, by PyArrow's reader when it is installed
             self.wells_dataframe = pd.read_csv(self.wells_path[index],
                                 sep=" ",
                                 header = None, 
-                                names= ["name","cdp_iline","cdp_xline","utmx","utmy", "depth"])
-
-            self.wells_dataframe["index"] = self.wells_dataframe["name"]
-            self.wells_dataframe.set_index("index", inplace = True)
-
-            # Adjusting the dataframe according to the survey
-            self.wells_dataframe = self.wells_dataframe[(self.wells_dataframe.cdp_iline >= self.basemap_dataframe.iline.min()) &
-                                                        (self.wells_dataframe.cdp_iline <= self.basemap_dataframe.iline.max()) &
-                                                        (self.wells_dataframe.cdp_xline >= self.basemap_dataframe.xline.min()) &
-                                                        (self.wells_dataframe.cdp_xline <= self.basemap_dataframe.xline.max())]
+                                names= ["name","cdp_iline","cdp_xline","utmx","utmy", "depth"],
+                                dtype = {"cdp_iline": "int32", "cdp_xline": "int32",
+                                         "utmx": self.coord_dtype, "utmy": self.coord_dtype, 
+                                         "depth": "float32"},
+                                engine = "c" if pa is None else "pyarrow")
+
+            # Wells indexed by name, without an extra column
+            self.wells_dataframe.index = self.wells_dataframe["name"].rename("index")
+
+            # Adjusting the dataframe according to the survey: a single mask and a single copy
+            self.wells_dataframe = self.wells_dataframe[_inside_lines(self.wells_dataframe["cdp_iline"].to_numpy(),
+                                                                      self.wells_dataframe["cdp_xline"].to_numpy(),
+                                                                      self.basemap_dataframe["iline"].to_numpy(),
+                                                                      self.basemap_dataframe["xline"].to_numpy())]
+            self._reset_modules()
             return(self.wells_dataframe)
         
         else:
@@ -1,11 +1,17 @@
 # Dependencies
 # file management
 import os
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from shutil import copyfile
 
 # Calc
 import numpy as np
 import pandas as pd
+from scipy.interpolate import CubicSpline
+from numba import njit
 
 # SEG-Y file management
 import segyio
@@ -22,6 +28,125 @@ hv.extension('bokeh')
 
 # Code
 
+# Threads computing the amplitudes of the displayed gathers, by process
+_gather_threads = {}
+
+# Memory held by the amplitudes of the displayed gathers, in bytes. Least recently displayed 
+# gathers are dropped beyond it
+_GATHER_CACHE_BYTES = 500 * 2**20
+
+@njit(cache = True, nogil = True)
+def _build_wiggle_arrays(amp, offsets, out):
+    
+    """
+    NAME
+    ----
+        _build_wiggle_arrays
+        
+    DESCRIPTION
+    -----------
+        Splits the amplitudes of a gather by polarity and shifts every trace by its scaling 
+        offset, in a single pass.
+        
+    ARGUMENTS
+    ---------
+        amp : (Numpy)array
+            Amplitudes of the gather. Shape (traces, samples).
+
+        offsets : (Numpy)array
+            Scaling offset of each trace, in amp's data type.
+
+        out : (Numpy)array
+            Buffer filled in place, shape (traces, 6, samples) and amp's data type. Each trace
+            gets its amplitudes, shifted amplitudes, positive and negative amplitudes (zero 
+            elsewhere), and the negative and positive ones shifted, in that order.
+            
+    """
+    
+    zero = amp.dtype.type(0)
+    for trace in range(amp.shape[0]):
+        offset = offsets[trace]
+        for sample in range(amp.shape[1]):
+            value = amp[trace, sample]
+            positive = value if value > 0 else zero
+            negative = value if value < 0 else zero
+            out[trace, 0, sample] = value
+            out[trace, 1, sample] = value + offset
+            out[trace, 2, sample] = positive
+            out[trace, 3, sample] = negative
+            out[trace, 4, sample] = negative + offset
+            out[trace, 5, sample] = positive + offset
+
+@njit(cache = True, nogil = True)
+def _ibm_to_float32(words):
+    
+    """
+    NAME
+    ----
+        _ibm_to_float32
+        
+    DESCRIPTION
+    -----------
+        Converts 4-byte IBM floating point samples (SEG-Y format 1) to IEEE single precision. 
+        The 24-bit IBM fraction fits the 24-bit IEEE significand, so the conversion is exact 
+        within float32's range.
+        
+    ARGUMENTS
+    ---------
+        words : (Numpy)array
+            Samples as native unsigned 32-bit integers. Shape (traces, samples).
+            
+    RETURN
+    ------
+        (Numpy)array
+            Samples as float32. Same shape as words.
+            
+    """
+    
+    values = np.empty(words.shape, dtype = np.float32)
+    for trace in range(words.shape[0]):
+        for sample in range(words.shape[1]):
+            word = words[trace, sample]
+            fraction = np.float64(word & 0x00FFFFFF) / 16777216.0
+            exponent = np.int64((word >> 24) & 0x7F) - 64
+            value = fraction * 16.0 ** exponent
+            values[trace, sample] = -value if word >> 31 else value
+    return values
+
+@njit(cache = True, nogil = True)
+def absmax(values):
+    
+    """
+    NAME
+    ----
+        absmax
+        
+    DESCRIPTION
+    -----------
+        Highest absolute value of an array, in a single pass and without allocating the 
+        absolute values. NaN samples are skipped.
+        
+    ARGUMENTS
+    ---------
+        values : (Numpy)array
+            One dimensional array.
+            
+    RETURN
+    ------
+        float
+            Highest absolute value. 0 for an empty array.
+            
+    """
+    
+    peak = 0.0
+    for index in range(values.shape[0]):
+        value = values[index]
+        if value < 0:
+            value = -value
+        if value > peak:
+            peak = value
+    return peak
+
 class WiggleModule:
     
     """
@@ -45,6 +170,9 @@ class WiggleModule:
         crosslines : list
             List of crosslines (numbers) within the survey. Empty by default.
 
+        survey : object
+            Survey object that instantiated this one. Its merge_path and angle_list are read from it.
+
         sample_interval : int instance attribute
             Sample interval in ms. Extracted and stored in this object by 
             Survey.cube_data_organization function.
@@ -62,14 +190,19 @@ class WiggleModule:
             default.
 
         time_axis : (Numpy) ndarray
-            Time axis for angle gather plot. Units in ms.
+            Time axis for angle gather plot, float32. Units in ms.
 
         interpolation_time : (Numpy) ndarray
             Interpolated time axis if interpolation attribute equal True.
 
-        scaling_factor : int
+        scaling_fac : float
             highest amplitude value to scale angle gather plots. Does not affect amplitude
-            content of the traces.
+            content of the traces. None until scaling_factor computes it.
+
+        use_segyio_trace_loader : bool
+            Whether the gathers are read by SegyIO instead of the memory map of the merge's 
+            trace section. False by default; the memory map is only used for 4-byte IBM and 
+            IEEE samples.
 
 
     METHODS
@@ -108,13 +241,17 @@ class WiggleModule:
                by connecting user defined widgets to plots. More information available at:
                     https://panel.holoviz.org/index.html
                     
+        Scipy: BSD licensed library for scientific computing. Its cubic splines resample the 
+               amplitudes. More information available at:
+                   https://scipy.org/
+                    
         SegyIO: LGPL licensed library for easy interaction with SEG-Y and Seismic Unix formatted 
                 seismic data, with binding for Python and Matlab. Made by Kvalsvik Jørgen in 
                 2014. Code Available at:
                     https://github.com/equinor/segyio.
                              
     """
-    def __init__(self, inlines, crosslines):
+    def __init__(self, inlines, crosslines, survey):
         
         """
         DESCRIPTION
@@ -126,7 +263,25 @@ class WiggleModule:
         
         self.inlines = inlines
         self.crosslines = crosslines
+        self.survey = survey
         self.interpolation = False
+        self.scaling_fac = None
+        self.use_segyio_trace_loader = False
+        # Merge file, opened by the first gather display
+        self._segy = None
+        # Samples of the merge (memory map) and first trace of each (inline, crossline) gather
+        self._traces = None
+        self._trace_index = None
+        # Scaling factor and angles the ticks and hover tools of the gathers were built for
+        self._plot_key = None
+        # Amplitudes of the last displayed gathers, by gather and display parameters, in 
+        # display order, and their size in bytes
+        self._amplitudes = OrderedDict()
+        self._amplitudes_bytes = 0
+        self._amplitudes_lock = threading.Lock()
+        # The lookup table of the gathers is built once, when the survey's modules are loaded
+        if os.path.exists(survey.merge_path):
+            WiggleModule._merge_traces(self)
         
     def scaling_factor(self, amp_array):
         
@@ -140,26 +295,242 @@ class WiggleModule:
             Computes the scaling factor attribute.
 
             The seismic data is scanned in order to extract the highest absolute value of amplitude.
+            Traces are scanned in blocks by a compiled kernel, in one pass and without 
+            allocating their absolute values.
             
         
         ARGUMENTS
         ---------
-            amp_array : (Numpy)ndarray
-                Array of cube's amplitudes.
+            amp_array : (Numpy)ndarray or SegyIO trace accessor
+                Cube's amplitudes, one trace per row. Anything sliced by rows into arrays (like 
+                segyio's trace.raw) is read block by block.
         
         RETURN
         ------
-            scaling_factor : int instance attribute
+            scaling_factor : float instance attribute
                 highest amplitude value to scale angle gather plots. Does not affect amplitude
                 content of the traces.
                 
         """
         
-        factor = abs(amp_array)
-        WiggleModule.scaling_fac = factor.max()
+        factor = 0.0
+        for start in range(0, len(amp_array), 4096):
+            factor = max(factor, absmax(np.ascontiguousarray(amp_array[start:start + 4096]).ravel()))
+        self.scaling_fac = factor
 
         return self.scaling_fac
 
+    def _merge_file(self):
+        
+        """
+        NAME
+        ----
+            _merge_file
+        
+        DESCRIPTION
+        -----------
+            Returns the merge file, opened (and memory mapped when the file system allows it) by
+            the first call and kept open for the following widget events. It is closed with this
+            object.
+            
+        RETURN
+        ------
+            segyio.SegyFile
+                Opened merge of the PAS.
+                
+        """
+        
+        if self._segy is None:
+            self._segy = segyio.open(self.survey.merge_path)
+            self._segy.mmap()
+            self._close_segy = weakref.finalize(self, self._segy.close)
+        return self._segy
+
+    def _merge_traces(self):
+        
+        """
+        NAME
+        ----
+            _merge_traces
+        
+        DESCRIPTION
+        -----------
+            Memory maps the trace section of the merge and builds the lookup table of the first 
+            trace of each gather by its inline and crossline, on the first call (when the object 
+            is instantiated, if the merge exists). The binary header gives the sample format and 
+            the number of extended textual headers; each trace is 60 4-byte words of header 
+            followed by its samples.
+            
+        RETURN
+        ------
+            (Numpy)memmap or None
+                Big endian samples of the merge, shape (traces, samples). None when the sample 
+                format is not 4-byte IBM or IEEE floating point, to be read by SegyIO.
+                
+        """
+        
+        if self._trace_index is None:
+            segy = self._merge_file()
+            dtype = {1: ">u4", 5: ">f4"}.get(int(segy.bin[segyio.BinField.Format]))
+            n_offsets = len(segy.offsets)
+            
+            # First trace of each gather: the merge is sorted by inline - crossline - angle
+            ilines = segy.attributes(segyio.TraceField.INLINE_3D)[::n_offsets]
+            xlines = segy.attributes(segyio.TraceField.CROSSLINE_3D)[::n_offsets]
+            self._trace_index = {(il, xl): index * n_offsets 
+                                 for index, (il, xl) in enumerate(zip(ilines.tolist(), xlines.tolist()))}
+            
+            if dtype is not None:
+                traces = np.memmap(self.survey.merge_path, dtype = dtype, mode = "r", 
+                                   offset = 3600 + 3200 * segy.ext_headers, 
+                                   shape = (segy.tracecount, 60 + len(segy.samples)))
+                self._traces = traces[:, 60:]
+        return self._traces
+
+    def _gathers(self, ilines, xlines):
+        
+        """
+        NAME
+        ----
+            _gathers
+        
+        DESCRIPTION
+        -----------
+            Reads the angle gathers of the merge crossed by the given lines, from the memory map
+            of its trace section. Samples are converted to native float32 as they are read. 
+            Falls back to SegyIO when use_segyio_trace_loader is True or the merge's sample 
+            format cannot be mapped.
+            
+        ARGUMENTS
+        ---------
+            ilines : int or slice
+                Inline number or range of inline numbers.
+
+            xlines : int or slice
+                Crossline number or range of crossline numbers.
+            
+        RETURN
+        ------
+            Generator
+                Gathers (Numpy array of shape (angles, samples)) in inline - crossline order.
+                
+        """
+        
+        traces = None if self.use_segyio_trace_loader else WiggleModule._merge_traces(self)
+        if traces is None:
+            gathers = self._merge_file().gather[ilines, xlines, :]
+            # A single gather is returned as an array, not as a generator
+            if isinstance(ilines, slice) or isinstance(xlines, slice):
+                yield from gathers
+            else:
+                yield gathers
+            return
+        
+        n_offsets = len(self._segy.offsets)
+        lines = []
+        for line in (ilines, xlines):
+            if isinstance(line, slice):
+                line = range(line.start, line.stop)
+            else:
+                line = [line]
+            lines.append(line)
+        
+        # First trace of every gather from the lookup table. The traces of all the gathers are
+        # read by one fancy index of the memory map and converted at once
+        first_traces = [self._trace_index[il, xl] for il in lines[0] for xl in lines[1] 
+                        if (il, xl) in self._trace_index]
+        if not first_traces:
+            return
+        rows = (np.asarray(first_traces)[:, None] + np.arange(n_offsets)).ravel()
+        if traces.dtype.kind == "u":
+            amp = _ibm_to_float32(traces[rows].astype("uint32"))
+        else:
+            amp = traces[rows].astype("float32")
+        yield from amp.reshape(len(first_traces), n_offsets, -1)
+
+    def _gather_amplitudes(self, iline, xline, time_slice, wiggle_buttons, time_interval):
+        
+        """
+        NAME
+        ----
+            _gather_amplitudes
+        
+        DESCRIPTION
+        -----------
+            Reads a gather and builds its amplitude DataFrame. Results are kept in the _amplitudes
+            cache, keyed by these (hashable) arguments, so a gather already displayed with the 
+            same parameters is not computed again. The least recently displayed gathers are 
+            dropped once the cache holds more than _GATHER_CACHE_BYTES. The time axes must have 
+            been built by the time function for time_interval.
+            
+        ARGUMENTS
+        ---------
+            iline : int
+                Inline number of the gather.
+
+            xline : int
+                Crossline number of the gather.
+
+            time_slice : tuple
+                Time slice of interest.
+
+            wiggle_buttons : str
+                Desired amplitude's plot type.
+
+            time_interval : int
+                Chosen time interval. Part of the cache key only.
+            
+        RETURN
+        ------
+            gather, amp_df : (Numpy)ndarray, (Pandas)DataFrame
+                Amplitudes of the gather and result of amp_dataframe. Must not be modified.
+                
+        """
+        
+        key = (iline, xline, time_slice, wiggle_buttons, time_interval)
+        with self._amplitudes_lock:
+            if key in self._amplitudes:
+                self._amplitudes.move_to_end(key)
+                return self._amplitudes[key]
+        gather = next(WiggleModule._gathers(self, iline, xline))
+        amp_df = WiggleModule.amp_dataframe(self, gather, time_slice, wiggle_buttons)
+        with self._amplitudes_lock:
+            # Another thread may have computed the same gather meanwhile
+            if key not in self._amplitudes:
+                self._amplitudes[key] = gather, amp_df
+                self._amplitudes_bytes += gather.nbytes + int(amp_df.memory_usage().sum())
+                while self._amplitudes_bytes > _GATHER_CACHE_BYTES and len(self._amplitudes) > 1:
+                    old_gather, old_df = self._amplitudes.popitem(last = False)[1]
+                    self._amplitudes_bytes -= old_gather.nbytes + int(old_df.memory_usage().sum())
+            return self._amplitudes[key]
+
+    def clear_cache(self):
+        
+        """
+        NAME
+        ----
+            clear_cache
+        
+        DESCRIPTION
+        -----------
+            Empties the cache of displayed gathers, closes the merge and forgets the scaling 
+            factor, so the following display reads the merge again (after a new merge, for 
+            instance).
+            
+        RETURN
+        ------
+            None
+                
+        """
+        
+        with self._amplitudes_lock:
+            self._amplitudes.clear()
+            self._amplitudes_bytes = 0
+        self.scaling_fac = None
+        if self._segy is not None:
+            self._close_segy()
+        self._segy = self._traces = self._trace_index = None
+
     def time(self, time_interval):
         
         """
@@ -202,13 +573,15 @@ class WiggleModule:
                 
         """
         
-        #f.samples returns all the array
+        #f.samples returns all the array. Single precision, like the amplitudes
         
-        WiggleModule.time_axis = np.arange(0, self.sample_interval * self.samples_per_trace, self.sample_interval)
+        WiggleModule.time_axis = np.arange(0, self.sample_interval * self.samples_per_trace, 
+                                           self.sample_interval).astype("float32")
 
         if time_interval != self.sample_interval:
             self.interpolation = True
-            WiggleModule.interpolation_time = np.arange(self.time_axis[0], self.time_axis[-1] + time_interval, time_interval)
+            WiggleModule.interpolation_time = np.arange(self.time_axis[0], self.time_axis[-1] + time_interval, 
+                                                        time_interval).astype("float32")
             return (self.interpolation_time)
         return (self.time_axis)
         
@@ -265,47 +638,80 @@ class WiggleModule:
                                                   gather.
                                                   
         """
-        amp_df = pd.DataFrame([])
-        s_factor = 0
-
-        for trace in range(gather.shape[0]):
-            if self.interpolation == True:
-                f_spline = interp1d(self.time_axis, gather[trace], kind="cubic")
-                amp = f_spline(self.interpolation_time)
-                # Extract this from the cicle
-                amp_df["time_axis"] = self.interpolation_time
-            else:
-                amp = gather[trace]
-                # Extract this from the cicle
-                amp_df["time_axis"] = self.time_axis
-
-            # Making two more series: Negative amplitude and positive amplitude
-            amp_df[f"amplitude_{Survey.angle_list[trace]}"] = amp
-            # Scalating amplitudes for plot
-            amp_df[f"s_amplitude_{Survey.angle_list[trace]}"] = amp_df[f"amplitude_{Survey.angle_list[trace]}"] + s_factor
-
-            if wiggle_buttons != "Wavelet":  #Might give delay to the plot
+        # Amplitudes of every trace as one matrix (traces, samples), in single precision as read
+        # from the SEG-Y
+        if self.interpolation == True:
+            # One spline for the whole gather: the traces share the time axis. Scipy evaluates 
+            # it in double precision
+            time_axis = self.interpolation_time
+            amp = CubicSpline(self.time_axis, gather, axis=1)(time_axis).astype("float32")
+        else:
+            time_axis = self.time_axis
+            amp = np.asarray(gather, dtype = "float32")
+
+        # Time slice, applied once to every trace
+        window = (time_axis >= time_slice[0]) & (time_axis <= time_slice[1])
+        time_axis, amp = time_axis[window], amp[:, window]
+
+        # Scaling offset of each trace for the plot
+        offsets = np.arange(amp.shape[0], dtype = amp.dtype) * self.scaling_fac
+
+        # Column names of each trace, in the order they are stored
+        names = ["amplitude_{}", "s_amplitude_{}"]
+        if wiggle_buttons != "Wavelet":
+            names += ["positive_amplitude_{}", "negative_amplitude_{}", 
+                      "s_negative_amplitude_{}", "s_positive_amplitude_{}"]
+        columns = [name.format(angle) for angle in self.survey.angle_list[:amp.shape[0]] for name in names]
+
+        # Every column in one preallocated buffer (traces, columns, samples). Its transpose is
+        # the DataFrame's block, so it is wrapped without copies
+        buffer = np.empty((amp.shape[0], len(names), amp.shape[1]), dtype = amp.dtype)
+        if wiggle_buttons != "Wavelet":
+            # Separating for polarity and scaling, in one pass
+            _build_wiggle_arrays(np.ascontiguousarray(amp), offsets.astype(amp.dtype, copy = False), buffer)
+        else:
+            buffer[:, 0] = amp
+            np.add(amp, offsets[:, None], out = buffer[:, 1])
+
+        amp_df = pd.DataFrame(buffer.reshape(-1, amp.shape[1])[:len(columns)].T, columns = columns, copy = False)
+        amp_df.insert(0, "time_axis", time_axis)
+        return (amp_df)
+
+    def _plot_tools(self):
+        
+        """
+        NAME
+        ----
+            _plot_tools
+        
+        DESCRIPTION
+        -----------
+            Builds the X axis ticks (angles at their scaled position) and the hover tool of 
+            each trace of the gathers. Both depend only on the scaling factor and the survey's 
+            angles, so they are rebuilt only when one of them changes instead of on every 
+            plotted gather.
             
-                amp_df[f"positive_amplitude_{Survey.angle_list[trace]}"] = amp_df[f"amplitude_{Survey.angle_list[trace]}"]
-                amp_df[f"negative_amplitude_{Survey.angle_list[trace]}"] = amp_df[f"amplitude_{Survey.angle_list[trace]}"]
-
-                # Separating for polarity
-                amp_df.loc[amp_df[f"positive_amplitude_{Survey.angle_list[trace]}"]
-                           < 0, f"positive_amplitude_{Survey.angle_list[trace]}"] = 0
-                amp_df.loc[amp_df[f"negative_amplitude_{Survey.angle_list[trace]}"]
-                           > 0, f"negative_amplitude_{Survey.angle_list[trace]}"] = 0
-
-                # Scalating amps for polarity
-                amp_df[f"s_negative_amplitude_{Survey.angle_list[trace]}"] = amp_df[
-                    f"negative_amplitude_{Survey.angle_list[trace]}"] + s_factor
-                amp_df[f"s_positive_amplitude_{Survey.angle_list[trace]}"] = amp_df[
-                    f"positive_amplitude_{Survey.angle_list[trace]}"] + s_factor
-
-            s_factor += self.scaling_fac
-
-        return (amp_df[(amp_df.time_axis >= time_slice[0]) & (amp_df.time_axis <= time_slice[1])])
-
-    def wiggle_plot(self, gather, time_slice, wiggle_buttons):
+        RETURN
+        ------
+            plot_xticks : list instance attribute
+                (Position, angle) tuples of the X axis.
+                
+            _hover_tools : list instance attribute
+                Bokeh HoverTool of each angle.
+                
+        """
+        
+        key = (self.scaling_fac, tuple(self.survey.angle_list))
+        if self._plot_key != key:
+            self.plot_xticks = [(angle_position * self.scaling_fac, angle) 
+                                for angle_position, angle in enumerate(self.survey.angle_list)]
+            self._hover_tools = [HoverTool(tooltips=[('Time', '@time_axis'),
+                                                     ('Amplitude', f"@amplitude_{angle}"),
+                                                     ("Angle", f"{angle}")]) 
+                                 for angle in self.survey.angle_list]
+            self._plot_key = key
+
+    def wiggle_plot(self, gather, time_slice, wiggle_buttons, amp_df = None):
         
         """
         NAME
@@ -335,6 +741,10 @@ class WiggleModule:
                 will fill with black the area between the sin curve and time_axis and "Colored
                 wiggle", will fill with blue/red the positive/negative area between the sin curve
                 and time_axis.
+
+            amp_df : (Pandas)DataFrame
+                Result of amp_dataframe for these arguments, when already computed. None by
+                default: it is computed here.
             
             WiggleMethod.interpolation : bool
                 Whether the amplitudes will be interpolated to improve wiggle display or not. 
@@ -346,26 +756,24 @@ class WiggleModule:
                 Compilation of traces within the angle gather.
                                                   
         """
-        amp_df = WiggleModule.amp_dataframe(self, gather, time_slice, wiggle_buttons)
+        if amp_df is None:
+            amp_df = WiggleModule.amp_dataframe(self, gather, time_slice, wiggle_buttons)
 
         # Initializing the plot
         wiggle_display = hv.Curve((0, 0))
 
-        # Computing scale factor for the X axis
-        WiggleModule.plot_xticks = [(angle_position * self.scaling_fac,
-                            Survey.angle_list[angle_position]) for angle_position in range(len(Survey.angle_list))]
+        # X axis ticks and hover of each trace
+        WiggleModule._plot_tools(self)
 
         # making the data to plot according a scaled value
         for trace in range(gather.shape[0]):
 
             # Hover designation
-            hover_w = HoverTool(tooltips=[('Time', '@time_axis'),
-                                          ('Amplitude', f"@amplitude_{Survey.angle_list[trace]}"),
-                                          ("Angle", f"{Survey.angle_list[trace]}")])
+            hover_w = self._hover_tools[trace]
 
             # Plotting the wiggle
-            wiggle = hv.Curve(amp_df, ["time_axis", f"s_amplitude_{Survey.angle_list[trace]}"],
-                                      [f"amplitude_{Survey.angle_list[trace]}"], label="W")
+            wiggle = hv.Curve(amp_df, ["time_axis", f"s_amplitude_{self.survey.angle_list[trace]}"],
+                                      [f"amplitude_{self.survey.angle_list[trace]}"], label="W")
             wiggle.opts(color="black", line_width=2, tools=[hover_w])
             
             if wiggle_buttons != "Wavelet":
@@ -378,8 +786,8 @@ class WiggleModule:
                 # Making the area plot more comfortable
                 x = amp_df["time_axis"]
                 y = self.scaling_fac * trace
-                y2 = amp_df[f"s_negative_amplitude_{Survey.angle_list[trace]}"]
-                y3 = amp_df[f"s_positive_amplitude_{Survey.angle_list[trace]}"]
+                y2 = amp_df[f"s_negative_amplitude_{self.survey.angle_list[trace]}"]
+                y3 = amp_df[f"s_positive_amplitude_{self.survey.angle_list[trace]}"]
 
                 # Fill in between: Holoviews Element
                 negative = hv.Area((x, y, y2), vdims=['y', 'y2'], label="-").opts(color=self.negative_amp, line_width=0)
@@ -398,6 +806,97 @@ class WiggleModule:
 
         return(wiggle_display)
 
+    def line_plot(self, line, names, time_slice, wiggle_buttons):
+        
+        """
+        NAME
+        ----
+           line_plot.
+        
+        DESCRIPTION
+        -----------
+            Plots the amplitudes of a whole seismic line of angle gathers.
+
+            Gathers are laid side by side in a single plot instead of one plot per gather: every 
+            wavelet of the line is a polyline of one Path element and every filled area a polygon 
+            of one Polygons element, so Bokeh draws a handful of glyphs whatever the amount of 
+            traces.
+
+        ARGUMENTS
+        ---------
+            line : (Numpy)ndarray
+                Amplitudes of the line. Shape (gathers, angles, samples).
+
+            names : list
+                Name of each gather of the line, e.g. "inline/crossline".
+            
+            time_slice : list
+                Time slice of interest. Can be given manually or by Panel's range slider widget.
+            
+            wiggle_buttons : str
+                Desired amplitude's plot type. Refer to wiggle_plot's docstring.
+            
+            WiggleMethod.interpolation : bool
+                Whether the amplitudes will be interpolated to improve wiggle display or not. 
+                False by default.
+            
+        RETURN
+        ------   
+            line_display : Holviews element [Overlay]
+                Wavelets, filled areas and gather names of the line.
+                                                  
+        """
+        
+        # Amplitudes within the time slice
+        if self.interpolation == True:
+            time_axis = self.interpolation_time
+            line = CubicSpline(self.time_axis, line, axis=-1)(time_axis)
+        else:
+            time_axis = self.time_axis
+        window = (time_axis >= time_slice[0]) & (time_axis <= time_slice[1])
+        # Amplitudes (and their positions) stay in single precision, as read from the SEG-Y
+        time_axis, line = time_axis[window], line[..., window].astype("float32", copy = False)
+
+        # Position of every trace. Gathers are separated by an empty angle
+        n_gathers, n_angles = line.shape[:2]
+        baseline = ((np.arange(n_gathers)[:, None] * (n_angles + 1) + np.arange(n_angles)) 
+                    * self.scaling_fac).astype("float32")
+        
+        # Wavelets: one polyline per trace
+        wavelets = [{"x": baseline[gather, angle] + line[gather, angle], "y": time_axis,
+                     "Gather": names[gather], "Angle": self.survey.angle_list[angle]} 
+                    for gather in range(n_gathers) for angle in range(n_angles)]
+        line_display = hv.Path(wavelets, vdims=["Gather", "Angle"]).opts(color="black", line_width=1, 
+                                                                          tools=["hover"])
+
+        if wiggle_buttons != "Wavelet":
+            
+            if wiggle_buttons == "Black wiggle":
+                WiggleModule.positive_amp, WiggleModule.negative_amp = "black", "black"
+            else: 
+                WiggleModule.positive_amp, WiggleModule.negative_amp = "blue", "red"
+
+            # Fill in between: one polygon per trace, closed along its baseline
+            y = np.concatenate([time_axis, time_axis[::-1]])
+            for polarity, color in ((np.maximum, self.positive_amp), (np.minimum, self.negative_amp)):
+                areas = [{"x": baseline[gather, angle] + np.concatenate([polarity(line[gather, angle], 0), 
+                                                                         np.zeros(len(time_axis), dtype = "float32")]),
+                          "y": y}
+                         for gather in range(n_gathers) for angle in range(n_angles)]
+                line_display = hv.Polygons(areas).opts(color=color, line_width=0) * line_display
+
+        # Gather names on top of each gather
+        names_display = hv.Labels((baseline.mean(axis=1), np.full(n_gathers, time_slice[0]), names))
+        line_display *= names_display.opts(text_font_size="8pt", text_baseline="bottom")
+
+        # Adding final customizations
+        line_display.opts(xaxis="top", invert_yaxis=True, xlabel=" ", ylabel="Time [ms]",
+                          xticks=[(baseline[gather, angle], self.survey.angle_list[angle]) 
+                                  for gather in range(n_gathers) for angle in range(n_angles)],
+                          ylim=(time_slice[0], time_slice[-1]))
+
+        return(line_display)
+
     def get_wiggle(self):
         
         """
@@ -446,6 +945,7 @@ class WiggleModule:
                     [9] IntRangeSlider for the selection of a time slice.
                     [10] IntSlider for sample interval selection.
                     [11] RadioButtonGroup for the selection of the desired wiggle display.
+                    [12] Button to reload the merge and empty the cache of gathers.
                 [1] Angle gather display.
                      
         FUNCTIONS
@@ -453,6 +953,12 @@ class WiggleModule:
             gather_plot(**kwargs)
                 Constructs a grid of angle gathers.
 
+            gather_time(**kwargs)
+                Redraws the displayed gathers with the chosen time slice and sample interval.
+
+            reload_gathers(**kwargs)
+                Empties the cache of gathers and displays them again from the merge.
+
             bg_widgets(**kwargs)
                 Links widget's color to seismic direction buttons in order to ease the
                 identification of widgets.
@@ -515,15 +1021,18 @@ class WiggleModule:
                                                step=int(WiggleModule.sample_interval/WiggleModule.sample_interval),
                                                value=WiggleModule.sample_interval)
 
+        # Time slice and sample interval of the displayed gathers. They are sent through the pipe 
+        # of the current grid, so the data of its gathers is replaced without rebuilding the grid
+        # (nor sending it to the browser again)
+        gather_pipe = {"pipe": None}
+
         # Decorator to mess up with the API
         @pn.depends(seismic_buttons.param.value, wiggle_buttons.param.value,
                     seismic_iline.param.value, traces_iline.param.value,
-                    seismic_xline.param.value, traces_xline.param.value,
-                    time_slice.param.value, time_interval.param.value)
+                    seismic_xline.param.value, traces_xline.param.value)
         def gather_plot(seismic_buttons, wiggle_buttons,
                         seismic_iline,traces_iline, 
-                        seismic_xline, traces_xline,
-                        time_slice, time_interval):
+                        seismic_xline, traces_xline):
             
             """
             NAME
@@ -535,7 +1044,8 @@ class WiggleModule:
                 Constructs a grid of angle gathers.
 
                 Collects angle gathers into one plot given a range of lines by using Holoviews
-                and bokeh as backend.
+                and bokeh as backend. Each gather is a DynamicMap redrawn by the time slice and
+                sample interval sent through its pipe.
                 
             ARGUMENTS
             ---------
@@ -563,12 +1073,6 @@ class WiggleModule:
                     traces_xline : tuple
                         Range of inlines to be intersected with seismic_xline.
 
-                    time_slice : list
-                        Time slice of interest. 
-
-                    time_interval : int
-                        Chosen time interval.
-
                     Survey.merge_path : str
                         Path where the merge of the PAS is located.
   
@@ -583,46 +1087,128 @@ class WiggleModule:
             # f.gather[2405, 2664, :] array // f.gather[2405:2408, 2664:2667, :] generator!! Presents errores while giving atributes
                 #When is not hardcoded
             
-            #Opening seismic file (once)
-            with segyio.open(Survey.merge_path) as segy:  
-                
-                gather_dict = {}
-                # Storing scaling fac
-                WiggleModule.scaling_factor(self, segyio.tools.collect(segy.trace[:]))
+            #Opening seismic file (once, kept open between widget events)
+            segy = self._merge_file()
+            
+            # Storing scaling fac: computed on the first event only, it is constant for the survey
+            if self.scaling_fac is None:
+                WiggleModule.scaling_factor(self, segy.trace.raw)
+            
+            # Gathers crossed by the chosen line, keyed by the number of the line crossed
+            WiggleModule._merge_traces(self)
+            if seismic_buttons == "Inline":
+                lines = {xline: (seismic_iline, xline) for xline in range(traces_iline[0], traces_iline[-1] + 1)}
+                kdims = [f"Crossline (Inline {seismic_iline})"]
+            elif seismic_buttons == "Crossline":
+                lines = {iline: (iline, seismic_xline) for iline in range(traces_xline[0], traces_xline[1] + 1)}
+                kdims = [f"Inline (Crossline {seismic_xline})"]
+            lines = {number: line for number, line in lines.items() if line in self._trace_index}
+
+            # New pipe for the new grid: the previous grid stops being redrawn
+            pipe = streams.Pipe(data = (time_slice.value, time_interval.value))
+            gather_pipe["pipe"] = pipe
+
+            # Amplitudes of every gather for the last time values sent. The first gather redrawn
+            # computes them all in threads (the numeric work releases the GIL); the Holoviews 
+            # elements are built by each gather afterwards. Gathers already displayed with the 
+            # same parameters come from the cache. Only gathers read from the memory map are 
+            # computed in threads: SegyIO's file handle is not thread safe
+            compute = map
+            if not self.use_segyio_trace_loader and self._traces is not None:
+                pid = os.getpid()
+                if pid not in _gather_threads:
+                    _gather_threads[pid] = ThreadPoolExecutor(max_workers = os.cpu_count())
+                compute = _gather_threads[pid].map
+            computed = {"data": None, "amplitudes": None}
+            
+            def amplitudes(data):
+                if computed["data"] != data:
+                    # Storing time array
+                    WiggleModule.time(self, data[1])
+                    computed["amplitudes"] = dict(zip(lines, compute(
+                        lambda line: WiggleModule._gather_amplitudes(
+                            self, *line, tuple(data[0]), wiggle_buttons, data[1]), 
+                        lines.values())))
+                    computed["data"] = data
+                return computed["amplitudes"]
+            
+            def display(number):
+                def redraw(data):
+                    gather, amp_df = amplitudes(data)[number]
+                    return WiggleModule.wiggle_plot(self, gather, data[0], wiggle_buttons, amp_df)
+                # Axes limits follow the time slice of each update
+                return hv.DynamicMap(redraw, streams = [pipe]).opts(opts.Curve(framewise = True), 
+                                                                     opts.Area(framewise = True))
+            
+            gather_dict = {number: display(number) for number in lines}
 
-                # Storing time array
-                WiggleModule.time(self, time_interval)
+            # Gathers
+            GridSpace = hv.GridSpace(gather_dict, kdims=kdims)
+            return(GridSpace)
+
+        def gather_time(event):
+            
+            """
+            NAME
+            ----
+                gather_time.
+            
+            DESCRIPTION
+            -----------
+                Sends the time slice and sample interval to the displayed gathers, which are 
+                redrawn in place.
                 
-                # Segyio gather Generator
-                if seismic_buttons == "Inline":
-                    trace_counter = traces_iline[0]
-                    for gather in segy.gather[seismic_iline, traces_iline[0]:traces_iline[-1] + 1, :]:
-                        gather_dict[f"{seismic_iline}/{trace_counter}"] = WiggleModule.wiggle_plot(self, 
-                                                                                                   gather, 
-                                                                                                   time_slice, 
-                                                                                                   wiggle_buttons)
-                        trace_counter += 1
-                elif seismic_buttons == "Crossline":
-                    trace_counter = traces_xline[0]
-                    for gather in segy.gather[traces_xline[0]:traces_xline[1] + 1, seismic_xline, :]:
-                        gather_dict[f"C{trace_counter}/{seismic_xline}"] = WiggleModule.wiggle_plot(self, 
-                                                                                                    gather, 
-                                                                                                    time_slice, 
-                                                                                                    wiggle_buttons)
-                        trace_counter += 1
-
-                # Gathers
-                GridSpace = hv.GridSpace(gather_dict, kdims=['Trace'])
-                return(GridSpace)
-                    
+            ARGUMENTS
+            ---------
+                event : param Event
+                    New value of either time widget. Both values are read from the widgets.
+                     
+            RETURN
+            ------
+                None
+
+            """
+            
+            if gather_pipe["pipe"] is not None:
+                gather_pipe["pipe"].send((time_slice.value, time_interval.value))
+
+        time_slice.param.watch(gather_time, 'value')
+        time_interval.param.watch(gather_time, 'value')
+
+        reload_button = pn.widgets.Button(name = "Reload", button_type = "success")
+
+        def reload_gathers(event):
+            
+            """
+            NAME
+            ----
+                reload_gathers.
+            
+            DESCRIPTION
+            -----------
+                Empties the cache of gathers and rebuilds the displayed grid from the merge.
                 
-                column = pn.Column('# Column', w1, w2, background='WhiteSmoke')
+            ARGUMENTS
+            ---------
+                event : param Event
+                    Click on the reload button.
+                     
+            RETURN
+            ------
+                None
+
+            """
+            
+            WiggleModule.clear_cache(self)
+            seismic_buttons.param.trigger('value')
+
+        reload_button.on_click(reload_gathers)
         
         widgets = pn.WidgetBox(f"## Gathers display menu",
                                line_input, gather_direction, seismic_buttons,
                                seismic_iline, traces_iline,
                                seismic_xline, traces_xline,
-                               trace_input, time_slice, time_interval, wiggle_buttons)
+                               trace_input, time_slice, time_interval, wiggle_buttons, reload_button)
 
         def bg_widgets(event):
             